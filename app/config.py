@@ -9,6 +9,27 @@ class Config:
     mod_chat_id: int
     feedback_chat_id: int
     forum_chat_id: int
+    # "single": all domain tables in one file, "separate": one file per domain
+    db_mode: str = "single"
+    db_path: str = ""
+    # "memory" or "sqlite" (shared between workers, survives restarts)
+    limiter_backend: str = "memory"
+    limiter_db_path: str = ""
+    # webhook mode is used instead of polling when webhook_url is set
+    webhook_url: str = ""
+    webhook_path: str = "/webhook"
+    webhook_secret: str = ""
+    webapp_host: str = "0.0.0.0"
+    webapp_port: int = 8080
+    # updates handled at once; one user's updates in a chat are never parallel
+    max_concurrent_updates: int = 50
+    # FSM states file; fsm_shared disables caching for multi-worker setups
+    fsm_db_path: str = ""
+    fsm_shared: bool = False
+    # replies to feedback older than this are no longer delivered
+    feedback_ttl_days: int = 90
+    # keep ids of menus to delete in app/history.db across restarts
+    history_persist: bool = True
 
 
 def load_config() -> 'Config':
@@ -19,4 +40,18 @@ def load_config() -> 'Config':
         mod_chat_id=int(os.getenv("MOD_CHAT_ID", 0)),
         feedback_chat_id=int(os.getenv("FEEDBACK_CHAT_ID", 0)),
         forum_chat_id=int(os.getenv("FORUM_CHAT_ID", 0)),
+        db_mode=os.getenv("DB_MODE", "single"),
+        db_path=os.getenv("DB_PATH", ""),
+        limiter_backend=os.getenv("LIMITER_BACKEND", "memory"),
+        limiter_db_path=os.getenv("LIMITER_DB_PATH", ""),
+        webhook_url=os.getenv("WEBHOOK_URL", ""),
+        webhook_path=os.getenv("WEBHOOK_PATH", "/webhook"),
+        webhook_secret=os.getenv("WEBHOOK_SECRET", ""),
+        webapp_host=os.getenv("WEBAPP_HOST", "0.0.0.0"),
+        webapp_port=int(os.getenv("WEBAPP_PORT", 8080)),
+        max_concurrent_updates=int(os.getenv("MAX_CONCURRENT_UPDATES", 50)),
+        fsm_db_path=os.getenv("FSM_DB_PATH", ""),
+        fsm_shared=os.getenv("FSM_SHARED", "").lower() in ("1", "true", "yes"),
+        feedback_ttl_days=int(os.getenv("FEEDBACK_TTL_DAYS", 90)),
+        history_persist=os.getenv("HISTORY_PERSIST", "1").lower() in ("1", "true", "yes"),
     )
@@ -26,3 +26,7 @@ MOD_STATS_BUTTON = "\U0001F4CA Статистика модерации"
 LEVEL_BEGINNER_BUTTON = "Уровень: Новичок"
 LEVEL_AMATEUR_BUTTON = "Уровень: Любитель"
 LEVEL_PRO_BUTTON = "Уровень: Про"
+LEVELS = (LEVEL_BEGINNER_BUTTON, LEVEL_AMATEUR_BUTTON, LEVEL_PRO_BUTTON)
+
+# Games with tournaments and Elo leaderboards
+GAMES = ("CS2", "Dota 2", "Valorant")
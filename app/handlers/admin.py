@@ -19,10 +19,18 @@ from app.constants import (
     LEVEL_BEGINNER_BUTTON,
     LEVEL_AMATEUR_BUTTON,
     LEVEL_PRO_BUTTON,
+    GAMES,
 )
 from . import start
 from app.utils import (
-    get_all_user_ids,
+    is_admin,
+    is_moderator,
+    is_muted,
+    is_banned,
+)
+from app.utils.broadcast import start_broadcast
+from app.utils.elo import ALL_LEVELS
+from app.utils.aio import (
     add_tournament,
     update_tournament,
     delete_tournament,
@@ -38,16 +46,17 @@ from app.utils import (
     add_xp,
     mute_user,
     ban_user,
-    is_muted,
-    is_banned,
     add_admin,
     add_moderator,
-    get_admins,
-    get_moderators,
     get_user_stats,
     get_strikes,
     clear_strikes,
     get_mod_stats,
+    get_queue_stats,
+    import_results_csv,
+    get_tournament,
+    record_match,
+    recompute_ratings,
 )
 
 router = Router()
@@ -59,12 +68,7 @@ cancel_kb = ReplyKeyboardMarkup(
 )
 
 game_kb = ReplyKeyboardMarkup(
-    keyboard=[
-        [KeyboardButton(text="CS2")],
-        [KeyboardButton(text="Dota 2")],
-        [KeyboardButton(text="Valorant")],
-        [KeyboardButton(text=BACK_BUTTON)],
-    ],
+    keyboard=[[KeyboardButton(text=game)] for game in GAMES] + [[KeyboardButton(text=BACK_BUTTON)]],
     resize_keyboard=True,
 )
 
@@ -139,23 +143,15 @@ async def broadcast(message: types.Message) -> None:
     if len(text) < 2:
         await message.answer("Usage: /broadcast <text>")
         return
-    payload = text[1]
-    count = 0
-    for user_id in get_all_user_ids():
-        try:
-            await message.bot.send_message(user_id, payload)
-            count += 1
-        except Exception:
-            pass
-    await message.answer(f"Рассылка отправлена {count} пользователям.")
+    await start_broadcast(message.bot, text[1], message.chat.id)
 
 
 def _is_admin(user_id: int) -> bool:
-    return user_id == _config.admin_id or user_id in get_admins()
+    return user_id == _config.admin_id or is_admin(user_id)
 
 
 def _is_staff(user_id: int) -> bool:
-    return _is_admin(user_id) or user_id in get_moderators()
+    return _is_admin(user_id) or is_moderator(user_id)
 
 
 def _menu_kb(user_id: int) -> ReplyKeyboardMarkup:
@@ -184,7 +180,7 @@ def _user_edit_kb(user_id: int) -> InlineKeyboardMarkup:
 
 
 async def _send_user_menu(bot: Bot, chat_id: int, user_id: int) -> None:
-    stats = get_user_stats(user_id) or {}
+    stats = await get_user_stats(user_id) or {}
     text = (
         f"ID: {user_id}\n"
         f"Username: @{stats.get('username') or 'нет'}\n"
@@ -199,7 +195,8 @@ async def _send_user_menu(bot: Bot, chat_id: int, user_id: int) -> None:
 async def mod_stats(message: types.Message) -> None:
     if not _is_staff(message.from_user.id):
         return
-    stats = get_mod_stats()
+    stats = await get_mod_stats()
+    queue = await get_queue_stats()
     top = "\n".join(
         f"{i+1}. {uid} — {count}" for i, (uid, count) in enumerate(stats["top_offenders"])
     )
@@ -208,7 +205,13 @@ async def mod_stats(message: types.Message) -> None:
     text = (
         f"Предупреждений за сутки: {stats['warnings_24h']}\n"
         f"Мутов/банов за сутки: {stats['mutes_bans_24h']}\n"
-        f"Топ-нарушителей:\n{top}"
+        f"Топ-нарушителей:\n{top}\n\n"
+        f"Заявок в очереди: {queue['pending']}"
+        f" (старейшая {queue['oldest_pending_age'] // 3600} ч)\n"
+        f"Ждут комментария: {queue['awaiting_comment']}\n"
+        f"Рассмотрено за сутки: {queue['decided_24h']},"
+        f" в среднем за {queue['avg_decision_time'] / 60:.0f} мин\n"
+        f"Истекло за сутки: {queue['expired_24h']}"
     )
     await message.answer(text, reply_markup=_menu_kb(message.from_user.id))
 
@@ -223,17 +226,77 @@ async def find_user(message: types.Message) -> None:
         return
     query = parts[1].strip()
     if query.startswith("@"):  # username search
-        stats = get_user_by_username(query[1:])
+        stats = await get_user_by_username(query[1:])
     elif query.isdigit():
-        stats = get_user_stats(int(query))
+        stats = await get_user_stats(int(query))
     else:
-        stats = get_user_by_username(query)
+        stats = await get_user_by_username(query)
     if not stats:
         await message.reply("User not found")
         return
     await _send_user_menu(message.bot, message.chat.id, stats["user_id"])
 
 
+@router.message(Command("results"))
+async def import_results(message: types.Message) -> None:
+    if not _is_admin(message.from_user.id):
+        return
+    parts = (message.text or message.caption).split()
+    if not message.document or len(parts) > 2 or (len(parts) == 2 and not parts[1].isdigit()):
+        await message.reply(
+            "Usage: send a CSV file (user_id,placement,delta) with caption /results [tournament_id]"
+        )
+        return
+    tid = int(parts[1]) if len(parts) == 2 else None
+    data = await message.bot.download(message.document)
+    try:
+        changed = await import_results_csv(data.read(), tid)
+    except ValueError as e:
+        await message.reply(str(e))
+        return
+    if changed is None:
+        await message.reply("Эти результаты уже учтены.")
+    else:
+        await message.reply(f"Результаты учтены, рейтинг изменён у {changed} игроков.")
+
+
+@router.message(Command("match"))
+async def add_match(message: types.Message) -> None:
+    if not _is_admin(message.from_user.id):
+        return
+    parts = message.text.split()
+    draw = parts[-1] == "draw"
+    if draw:
+        parts.pop()
+    if len(parts) != 4 or not all(p.isdigit() for p in parts[1:]):
+        await message.reply("Usage: /match <tournament_id> <winner_id> <loser_id> [draw]")
+        return
+    tid, winner_id, loser_id = map(int, parts[1:])
+    tour = await get_tournament(tid)
+    if not tour:
+        await message.reply("Турнир не найден.")
+        return
+    _, game, level, *_ = tour
+    if not game:
+        await message.reply("У турнира не указана игра.")
+        return
+    try:
+        winner, loser = await record_match(game, level or ALL_LEVELS, winner_id, loser_id, draw, tid)
+    except ValueError as e:
+        await message.reply(str(e))
+        return
+    await message.reply(f"Матч записан. Рейтинг {game}: {winner_id} — {winner:.0f}, {loser_id} — {loser:.0f}")
+
+
+@router.message(Command("recompute_elo"))
+async def recompute_elo(message: types.Message) -> None:
+    if not _is_admin(message.from_user.id):
+        return
+    start = time.perf_counter()
+    count = await recompute_ratings()
+    await message.reply(f"Пересчитано матчей: {count} за {time.perf_counter() - start:.1f} с")
+
+
 @router.message(F.text == SEARCH_USER_BUTTON)
 async def ask_search_query(message: types.Message, state: FSMContext) -> None:
     if not _is_admin(message.from_user.id):
@@ -255,11 +318,11 @@ async def process_search(message: types.Message, state: FSMContext) -> None:
         return
     query = message.text.strip()
     if query.startswith("@"):  # username search
-        stats = get_user_by_username(query[1:])
+        stats = await get_user_by_username(query[1:])
     elif query.isdigit():
-        stats = get_user_stats(int(query))
+        stats = await get_user_stats(int(query))
     else:
-        stats = get_user_by_username(query)
+        stats = await get_user_by_username(query)
     await state.clear()
     if not stats:
         await message.answer("User not found", reply_markup=_menu_kb(message.from_user.id))
@@ -354,7 +417,7 @@ async def ask_preview(message: types.Message, state: FSMContext) -> None:
 @router.message(TournamentCreate.waiting_preview)
 async def save_tournament(message: types.Message, state: FSMContext) -> None:
     data = await state.get_data()
-    add_tournament(
+    await add_tournament(
         data.get("game"),
         data.get("level"),
         data.get("type"),
@@ -373,7 +436,7 @@ async def save_tournament(message: types.Message, state: FSMContext) -> None:
 async def manage_tournaments(message: types.Message) -> None:
     if not _is_admin(message.from_user.id):
         return
-    tournaments = get_tournaments()
+    tournaments = await get_tournaments()
     if not tournaments:
         await message.answer("Турниры не запланированы", reply_markup=cancel_kb)
         return
@@ -397,7 +460,7 @@ async def manage_tournaments(message: types.Message) -> None:
 async def list_mutes(message: types.Message) -> None:
     if not _is_staff(message.from_user.id):
         return
-    entries = get_all_mutes()
+    entries = await get_all_mutes()
     if not entries:
         await message.answer("Список мута пуст", reply_markup=cancel_kb)
         return
@@ -413,7 +476,7 @@ async def list_mutes(message: types.Message) -> None:
 async def list_bans(message: types.Message) -> None:
     if not _is_staff(message.from_user.id):
         return
-    entries = get_all_bans()
+    entries = await get_all_bans()
     if not entries:
         await message.answer("Список банов пуст", reply_markup=cancel_kb)
         return
@@ -481,7 +544,7 @@ async def edit_ask_preview(message: types.Message, state: FSMContext) -> None:
 @router.message(TournamentEdit.waiting_preview)
 async def save_edit(message: types.Message, state: FSMContext) -> None:
     data = await state.get_data()
-    update_tournament(
+    await update_tournament(
         data.get("edit_id"),
         data.get("game"),
         data.get("level"),
@@ -503,7 +566,7 @@ async def cb_delete_tournament(callback: types.CallbackQuery) -> None:
         await callback.answer()
         return
     tid = int(callback.data.split(":", 1)[1])
-    delete_tournament(tid)
+    await delete_tournament(tid)
     await callback.answer("Турнир удален")
     await callback.message.edit_text("Удален")
 
@@ -514,7 +577,7 @@ async def cb_list_participants(callback: types.CallbackQuery) -> None:
         await callback.answer()
         return
     tid = int(callback.data.split(":", 1)[1])
-    entries = get_participants(tid)
+    entries = await get_participants(tid)
     if not entries:
         await callback.answer("Список пуст", show_alert=True)
         return
@@ -526,7 +589,7 @@ async def cb_list_participants(callback: types.CallbackQuery) -> None:
                 [InlineKeyboardButton(text="Исключить", callback_data=f"kick_part:{tid}:{user_id}")]
             ]
         )
-        stats = get_user_stats(user_id)
+        stats = await get_user_stats(user_id)
         username = f"@{stats.get('username')}" if stats and stats.get('username') else "нет"
         await callback.message.answer(f"{nickname} ({age}) — {username}", reply_markup=kb)
 
@@ -537,7 +600,7 @@ async def cb_kick_participant(callback: types.CallbackQuery) -> None:
         await callback.answer()
         return
     _, tid, uid = callback.data.split(":")
-    remove_participant(int(tid), int(uid))
+    await remove_participant(int(tid), int(uid))
     await callback.answer("Исключен")
     await callback.message.edit_text("Исключен")
 
@@ -545,7 +608,7 @@ async def cb_kick_participant(callback: types.CallbackQuery) -> None:
 @router.callback_query(F.data.startswith("unmute:"))
 async def cb_unmute(callback: types.CallbackQuery) -> None:
     user_id = int(callback.data.split(":", 1)[1])
-    unmute_user(user_id)
+    await unmute_user(user_id)
     await callback.answer("Пользователь размучен")
     await callback.message.edit_text("Размучен")
 
@@ -553,7 +616,7 @@ async def cb_unmute(callback: types.CallbackQuery) -> None:
 @router.callback_query(F.data.startswith("unban:"))
 async def cb_unban(callback: types.CallbackQuery) -> None:
     user_id = int(callback.data.split(":", 1)[1])
-    unban_user(user_id)
+    await unban_user(user_id)
     await callback.answer("Пользователь разбанен")
     await callback.message.edit_text("Разбанен")
 
@@ -587,7 +650,7 @@ async def process_title(message: types.Message, state: FSMContext) -> None:
     title = message.text.strip()
     if title == "-":
         title = ""
-    set_user_title(uid, title)
+    await set_user_title(uid, title)
     await state.clear()
     await message.answer("Титул обновлен")
     await _send_user_menu(message.bot, message.chat.id, uid)
@@ -627,7 +690,7 @@ async def process_xp(message: types.Message, state: FSMContext) -> None:
     except ValueError:
         await message.answer("Нужно число")
         return
-    add_xp(uid, amount * sign)
+    await add_xp(uid, amount * sign)
     await state.clear()
     await message.answer("XP изменено")
     await _send_user_menu(message.bot, message.chat.id, uid)
@@ -654,7 +717,7 @@ async def process_mute(message: types.Message, state: FSMContext) -> None:
     except ValueError:
         await message.answer("Нужно число")
         return
-    mute_user(uid, hours * 3600 if hours > 0 else 0, moderator_id=message.from_user.id, reason="admin")
+    await mute_user(uid, hours * 3600 if hours > 0 else 0, moderator_id=message.from_user.id, reason="admin")
     await state.clear()
     await message.answer("Мут установлен")
     await message.bot.send_message(
@@ -685,7 +748,7 @@ async def process_ban(message: types.Message, state: FSMContext) -> None:
     except ValueError:
         await message.answer("Нужно число")
         return
-    ban_user(uid, hours * 3600 if hours > 0 else 0, moderator_id=message.from_user.id, reason="admin")
+    await ban_user(uid, hours * 3600 if hours > 0 else 0, moderator_id=message.from_user.id, reason="admin")
     try:
         await message.bot.ban_chat_member(_config.forum_chat_id, uid, until_date=int(time.time()) + hours * 3600 if hours > 0 else None)
     except Exception:
@@ -705,7 +768,7 @@ async def cb_strikes(callback: types.CallbackQuery) -> None:
         await callback.answer()
         return
     uid = int(callback.data.split(":", 1)[1])
-    count = get_strikes(uid)
+    count = await get_strikes(uid)
     kb = InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text="Сбросить", callback_data=f"clearstrikes:{uid}")],
@@ -722,7 +785,7 @@ async def cb_clear_strikes(callback: types.CallbackQuery) -> None:
         await callback.answer()
         return
     uid = int(callback.data.split(":", 1)[1])
-    clear_strikes(uid)
+    await clear_strikes(uid)
     await callback.message.answer("Страйки сброшены")
     await _send_user_menu(callback.bot, callback.message.chat.id, uid)
     await callback.answer()
@@ -753,9 +816,9 @@ async def promote_user(message: types.Message) -> None:
         return
     role = parts[2].lower()
     if role == "admin":
-        add_admin(user_id)
+        await add_admin(user_id)
     elif role == "mod":
-        add_moderator(user_id)
+        await add_moderator(user_id)
     else:
         await message.reply("Role must be admin or mod")
         return
@@ -12,10 +12,10 @@ from app.constants import (
     COMPLAINT_BUTTON,
     BACK_BUTTON,
 )
-from app.utils.spam import check_message_allowed
 from app.config import Config
 from . import start
-from app.utils import record_message, record_sent, cleanup
+from app.utils import record_message, record_sent, cleanup, set_thread_ttl
+from app.utils.aio import add_thread, check_message_allowed, get_thread_user
 
 router = Router()
 _config: Config
@@ -24,6 +24,7 @@ _config: Config
 def setup(config: Config) -> None:
     global _config
     _config = config
+    set_thread_ttl(config.feedback_ttl_days * 86400)
 
 
 feedback_kb = ReplyKeyboardMarkup(
@@ -48,9 +49,6 @@ class FeedbackState(StatesGroup):
     waiting_complaint = State()
 
 
-entries: dict[int, int] = {}
-
-
 @router.message(Command("feedback"), F.chat.type == ChatType.PRIVATE)
 @router.message(F.text == FEEDBACK_BUTTON, F.chat.type == ChatType.PRIVATE)
 async def feedback_menu(message: types.Message) -> None:
@@ -94,7 +92,7 @@ async def cancel_proposal(message: types.Message, state: FSMContext) -> None:
 async def handle_proposal(message: types.Message, state: FSMContext) -> None:
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    allowed, reason = check_message_allowed(message.from_user.id, message.text or "")
+    allowed, reason = await check_message_allowed(message.from_user.id, message.text or "")
     if not allowed:
         sent = await message.answer(reason)
         record_sent(sent)
@@ -103,7 +101,7 @@ async def handle_proposal(message: types.Message, state: FSMContext) -> None:
         _config.feedback_chat_id,
         f"[Предложение]\nОт {message.from_user.full_name} ({message.from_user.id})\n{message.text}",
     )
-    entries[mod_msg.message_id] = message.chat.id
+    await add_thread(mod_msg.message_id, message.chat.id, "proposal")
     sent = await message.answer(
         "Отправили твоё предложение, спасибо за активность!",
         reply_markup=start.get_menu_kb(message.from_user.id),
@@ -134,7 +132,7 @@ async def cancel_question(message: types.Message, state: FSMContext) -> None:
 async def handle_question(message: types.Message, state: FSMContext) -> None:
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    allowed, reason = check_message_allowed(message.from_user.id, message.text or "")
+    allowed, reason = await check_message_allowed(message.from_user.id, message.text or "")
     if not allowed:
         sent = await message.answer(reason)
         record_sent(sent)
@@ -143,7 +141,7 @@ async def handle_question(message: types.Message, state: FSMContext) -> None:
         _config.feedback_chat_id,
         f"[Вопрос]\nОт {message.from_user.full_name} ({message.from_user.id})\n{message.text}",
     )
-    entries[mod_msg.message_id] = message.chat.id
+    await add_thread(mod_msg.message_id, message.chat.id, "question")
     sent = await message.answer(
         "Спасибо за вопрос, ответим в скором времени!",
         reply_markup=start.get_menu_kb(message.from_user.id),
@@ -177,7 +175,7 @@ async def cancel_complaint(message: types.Message, state: FSMContext) -> None:
 async def handle_complaint(message: types.Message, state: FSMContext) -> None:
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    allowed, reason = check_message_allowed(message.from_user.id, message.text or "")
+    allowed, reason = await check_message_allowed(message.from_user.id, message.text or "")
     if not allowed:
         sent = await message.answer(reason)
         record_sent(sent)
@@ -186,7 +184,7 @@ async def handle_complaint(message: types.Message, state: FSMContext) -> None:
         _config.feedback_chat_id,
         f"[Жалоба]\nОт {message.from_user.full_name} ({message.from_user.id})\n{message.text}",
     )
-    entries[mod_msg.message_id] = message.chat.id
+    await add_thread(mod_msg.message_id, message.chat.id, "complaint")
     sent = await message.answer("Всё решим, не волнуйся!", reply_markup=start.get_menu_kb(message.from_user.id))
     record_sent(sent)
     await state.clear()
@@ -194,7 +192,7 @@ async def handle_complaint(message: types.Message, state: FSMContext) -> None:
 
 @router.message(lambda m: m.chat.id == _config.feedback_chat_id and m.reply_to_message)
 async def moderator_reply(message: types.Message) -> None:
-    user_id = entries.get(message.reply_to_message.message_id)
+    user_id = await get_thread_user(message.reply_to_message.message_id)
     if not user_id:
         return
     await message.send_copy(user_id)
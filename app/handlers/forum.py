@@ -5,21 +5,21 @@ from random import choice
 import time
 
 from app.config import Config
-from app.utils import (
+from app.utils import is_muted
+from app.utils.aio import (
+    check_message_allowed,
     add_user,
-    add_xp,
     add_warning,
     get_warnings,
     clear_warnings,
     mute_user,
     unmute_user,
     unban_user,
-    is_muted,
     ban_user,
     get_strikes,
     clear_strikes,
 )
-from app.utils.spam import check_message_allowed
+from app.utils.writebehind import queue_activity
 from app.constants import BOT_USERNAME
 
 router = Router()
@@ -60,7 +60,7 @@ async def handle_new_member(event: types.ChatMemberUpdated) -> None:
         if user.is_bot:
             await event.bot.ban_chat_member(event.chat.id, user.id)
             return
-        add_user(user)
+        await add_user(user)
         try:
             await event.bot.send_message(
                 event.chat.id,
@@ -76,7 +76,7 @@ async def moderate_group_message(message: types.Message) -> None:
         await message.delete()
         return
 
-    allowed, reason = check_message_allowed(
+    allowed, reason = await check_message_allowed(
         message.from_user.id, message.text or message.caption or ""
     )
     if not allowed:
@@ -94,20 +94,20 @@ async def moderate_group_message(message: types.Message) -> None:
             "Повторяющийся контент.",
             "Слишком много капса и эмодзи.",
         }:
-            count = add_warning(message.from_user.id, reason=reason)
+            count = await add_warning(message.from_user.id, reason=reason)
             await message.bot.send_message(
                 _config.mod_chat_id,
                 f"⚠️ {mention} предупреждение: {reason}",
                 parse_mode="HTML",
             )
             if count >= 4:
-                mute_user(message.from_user.id, 24 * 3600, reason="limit")
+                await mute_user(message.from_user.id, 24 * 3600, reason="limit")
                 await message.bot.send_message(
                     _config.mod_chat_id,
                     f"🔇 {mention} получил мут на 24ч (превышен лимит)",
                     parse_mode="HTML",
                 )
-                clear_warnings(message.from_user.id)
+                await clear_warnings(message.from_user.id)
                 try:
                     await message.bot.restrict_chat_member(
                         _config.forum_chat_id,
@@ -164,13 +164,12 @@ async def moderate_group_message(message: types.Message) -> None:
             except Exception:
                 pass
         return
-    add_user(message.from_user)
-    add_xp(message.from_user.id, 1)
+    queue_activity(message.from_user, xp=1)
 
 
 @router.message(lambda m: m.chat.id == _config.forum_chat_id and _is_addressed(m))
 async def handle_smalltalk(message: types.Message) -> None:
-    allowed, _ = check_message_allowed(
+    allowed, _ = await check_message_allowed(
         message.from_user.id, message.text or message.caption or ""
     )
     if not allowed:
@@ -204,7 +203,7 @@ async def cmd_mute(message: types.Message) -> None:
         await message.reply("Invalid user id")
         return
     hours = int(parts[2]) if len(parts) > 2 else 24
-    mute_user(user_id, hours * 3600, moderator_id=message.from_user.id, reason="manual")
+    await mute_user(user_id, hours * 3600, moderator_id=message.from_user.id, reason="manual")
     try:
         await message.bot.restrict_chat_member(
             _config.forum_chat_id,
@@ -234,7 +233,7 @@ async def cmd_unmute(message: types.Message) -> None:
     except ValueError:
         await message.reply("Invalid user id")
         return
-    unmute_user(user_id)
+    await unmute_user(user_id)
     try:
         await message.bot.restrict_chat_member(
             _config.forum_chat_id,
@@ -259,7 +258,7 @@ async def cmd_ban(message: types.Message) -> None:
     except ValueError:
         await message.reply("Invalid user id")
         return
-    ban_user(user_id, moderator_id=message.from_user.id, reason="manual")
+    await ban_user(user_id, moderator_id=message.from_user.id, reason="manual")
     try:
         await message.bot.ban_chat_member(_config.forum_chat_id, user_id)
         await message.reply("User banned")
@@ -286,7 +285,7 @@ async def cmd_unban(message: types.Message) -> None:
         return
     try:
         await message.bot.unban_chat_member(_config.forum_chat_id, user_id)
-        unban_user(user_id)
+        await unban_user(user_id)
         await message.reply("User unbanned")
     except Exception:
         await message.reply("Failed to unban user")
@@ -305,7 +304,7 @@ async def cmd_warnings(message: types.Message) -> None:
     except ValueError:
         await message.reply("Invalid user id")
         return
-    count = get_warnings(user_id)
+    count = await get_warnings(user_id)
     await message.reply(f"Warnings: {count}")
 
 
@@ -322,7 +321,7 @@ async def cmd_clearwarn(message: types.Message) -> None:
     except ValueError:
         await message.reply("Invalid user id")
         return
-    clear_warnings(user_id)
+    await clear_warnings(user_id)
     await message.reply("Warnings cleared")
 
 
@@ -339,7 +338,7 @@ async def cmd_strikes(message: types.Message) -> None:
     except ValueError:
         await message.reply("Invalid user id")
         return
-    count = get_strikes(user_id)
+    count = await get_strikes(user_id)
     await message.reply(f"Strikes: {count}")
 
 
@@ -356,6 +355,6 @@ async def cmd_clearstrikes(message: types.Message) -> None:
     except ValueError:
         await message.reply("Invalid user id")
         return
-    clear_strikes(user_id)
+    await clear_strikes(user_id)
     await message.reply("Strikes cleared")
 
@@ -3,13 +3,17 @@ from aiogram.filters import Command
 from aiogram.enums import ChatType
 
 from app.utils import (
+    record_message,
+    record_sent,
+    cleanup,
+    player_count,
+)
+from app.utils.aio import (
     add_user,
     get_user_stats,
     get_warnings,
     get_user_achievements,
-    record_message,
-    record_sent,
-    cleanup,
+    get_player_rank,
 )
 from app.constants import PROFILE_BUTTON
 from . import start
@@ -40,13 +44,14 @@ def get_rank(xp: int) -> str:
 async def handle_profile(message: types.Message) -> None:
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    add_user(message.from_user)
-    stats = get_user_stats(message.from_user.id) or {}
+    await add_user(message.from_user)
+    stats = await get_user_stats(message.from_user.id) or {}
     xp = stats.get("xp", 0)
     title = stats.get("title") or "-"
-    warnings = get_warnings(message.from_user.id)
-    achievements = get_user_achievements(message.from_user.id)
+    warnings = await get_warnings(message.from_user.id)
+    achievements = await get_user_achievements(message.from_user.id)
     rank = get_rank(xp)
+    place = await get_player_rank(message.from_user.id)
 
     text = (
         f"Username: @{message.from_user.username or 'нет'}\n"
@@ -55,6 +60,8 @@ async def handle_profile(message: types.Message) -> None:
         f"Ранг: {rank}\n"
         f"Титул: {title}"
     )
+    if place is not None:
+        text += f"\nМесто в рейтинге: {place[0]} из {player_count()} ({place[1]} очков)"
     if achievements:
         text += "\n\nДостижения:\n" + "\n".join(achievements)
     sent = await message.answer(text, reply_markup=start.get_menu_kb(message.from_user.id))
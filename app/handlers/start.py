@@ -17,13 +17,13 @@ from app.constants import (
     MOD_STATS_BUTTON,
 )
 from app.utils import (
-    add_user,
-    get_admins,
-    get_moderators,
+    is_admin,
+    is_moderator,
     record_message,
     record_sent,
     cleanup,
 )
+from app.utils.aio import add_user
 from app.config import Config
 
 router = Router()
@@ -31,15 +31,20 @@ router = Router()
 _config: Config
 
 
+def get_role(user_id: int) -> str:
+    """Return role name of the user: main_admin, admin, moderator or user."""
+    if user_id == _config.admin_id:
+        return "main_admin"
+    if is_admin(user_id):
+        return "admin"
+    if is_moderator(user_id):
+        return "moderator"
+    return "user"
+
+
 def get_menu_kb(user_id: int) -> ReplyKeyboardMarkup:
     """Return menu keyboard appropriate for the user."""
-    if user_id == _config.admin_id:
-        return main_admin_kb
-    if user_id in get_admins():
-        return admin_kb
-    if user_id in get_moderators():
-        return moderator_kb
-    return menu_kb
+    return role_kbs[get_role(user_id)]
 
 
 def setup(config: Config) -> None:
@@ -90,12 +95,19 @@ main_admin_kb = ReplyKeyboardMarkup(
     resize_keyboard=True,
 )
 
+role_kbs = {
+    "main_admin": main_admin_kb,
+    "admin": admin_kb,
+    "moderator": moderator_kb,
+    "user": menu_kb,
+}
+
 
 @router.message(CommandStart(), F.chat.type == ChatType.PRIVATE)
 async def handle_start(message: types.Message):
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    add_user(message.from_user)
+    await add_user(message.from_user)
     user_id = message.from_user.id
     kb = get_menu_kb(user_id)
     if kb is main_admin_kb:
@@ -10,16 +10,23 @@ from aiogram.types import (
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
-from app.utils.spam import check_message_allowed
 from app.utils import (
+    record_message,
+    record_sent,
+    cleanup,
+    awaiting_comment,
+)
+from app.utils.aio import (
+    check_message_allowed,
     add_user,
     increment_submission,
     record_result,
     record_meme,
     record_video,
-    record_message,
-    record_sent,
-    cleanup,
+    add_submission,
+    get_submission,
+    decide_submission,
+    finish_submission,
 )
 from app.config import Config
 from app.constants import SUGGEST_BUTTON, BACK_BUTTON
@@ -37,9 +44,6 @@ class Suggest(StatesGroup):
     waiting_for_content = State()
 
 
-suggestions: dict[int, dict] = {}
-waiting_comments: dict[int, int] = {}
-
 _config: Config | None = None
 
 def setup(config: Config):
@@ -52,7 +56,7 @@ def setup(config: Config):
 async def cmd_suggest(message: types.Message, state: FSMContext):
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    add_user(message.from_user)
+    await add_user(message.from_user)
     await state.set_state(Suggest.waiting_for_content)
     sent = await message.answer(
         "Отправьте контент (фото, видео, текст, гиф или музыку) для модерации.",
@@ -74,7 +78,7 @@ async def cancel_suggest(message: types.Message, state: FSMContext) -> None:
 async def receive_content(message: types.Message, state: FSMContext):
     await cleanup(message.bot, message.chat.id)
 
-    allowed, reason = check_message_allowed(
+    allowed, reason = await check_message_allowed(
         message.chat.id, message.text or message.caption or ""
     )
     if not allowed:
@@ -101,14 +105,10 @@ async def receive_content(message: types.Message, state: FSMContext):
         reply_markup=kb,
     )
 
-    add_user(message.from_user)
-    increment_submission(message.from_user.id)
+    await add_user(message.from_user)
+    await increment_submission(message.from_user.id)
 
-    suggestions[mod_message.message_id] = {
-        "user_id": message.chat.id,
-        "decision": None,
-        "type": ctype,
-    }
+    await add_submission(mod_message.message_id, message.chat.id, ctype)
 
     sent2 = await message.answer(
         "Контент отправлен на модерацию.",
@@ -120,14 +120,17 @@ async def receive_content(message: types.Message, state: FSMContext):
 
 @router.callback_query(F.data.in_({"approve", "reject"}))
 async def moderation_decision(callback: types.CallbackQuery):
-    entry = suggestions.get(callback.message.message_id)
+    # buttons of closed submissions stay in the chat, answer them from the cache
+    if await get_submission(callback.message.message_id) is None:
+        await callback.answer("Заявка уже закрыта.")
+        return
+    entry = await decide_submission(
+        callback.message.message_id, callback.from_user.id, callback.data
+    )
     if not entry:
         await callback.answer()
         return
 
-    entry["decision"] = callback.data
-    waiting_comments[callback.from_user.id] = callback.message.message_id
-
     skip_kb = InlineKeyboardMarkup(
         inline_keyboard=[[InlineKeyboardButton(text="Пропустить", callback_data="skip")]]
     )
@@ -143,13 +146,12 @@ async def moderation_decision(callback: types.CallbackQuery):
 
 @router.message(lambda message: message.chat.id == _config.mod_chat_id)
 async def moderator_comment(message: types.Message):
-    mod_msg_id = waiting_comments.get(message.from_user.id)
+    mod_msg_id = awaiting_comment(message.from_user.id)
     if not mod_msg_id:
         return
 
-    entry = suggestions.pop(mod_msg_id, None)
+    entry = await finish_submission(mod_msg_id)
     if not entry:
-        waiting_comments.pop(message.from_user.id, None)
         return
 
     decision = entry["decision"] == "approve"
@@ -163,23 +165,22 @@ async def moderator_comment(message: types.Message):
 
     sent = await message.bot.send_message(entry["user_id"], answer)
     record_sent(sent)
-    record_result(entry["user_id"], decision)
+    await record_result(entry["user_id"], decision)
     if decision:
         if entry.get("type") == "video":
-            new_ach = record_video(entry["user_id"])
+            new_ach = await record_video(entry["user_id"])
         else:
-            new_ach = record_meme(entry["user_id"])
+            new_ach = await record_meme(entry["user_id"])
         for ach in new_ach:
             sent_a = await message.bot.send_message(entry["user_id"], f"Получено достижение: {ach}!")
             record_sent(sent_a)
-    waiting_comments.pop(message.from_user.id, None)
     await message.reply("Ответ отправлен пользователю.")
 
 
 @router.callback_query(F.data == "skip")
 async def skip_comment(callback: types.CallbackQuery):
-    mod_msg_id = waiting_comments.pop(callback.from_user.id, None)
-    entry = suggestions.pop(mod_msg_id, None) if mod_msg_id else None
+    mod_msg_id = awaiting_comment(callback.from_user.id)
+    entry = await finish_submission(mod_msg_id) if mod_msg_id else None
     if not entry:
         await callback.answer()
         return
@@ -188,12 +189,12 @@ async def skip_comment(callback: types.CallbackQuery):
     text = "Ваш контент принят!" if decision else "Ваш контент отклонен."
     sent = await callback.bot.send_message(entry["user_id"], text)
     record_sent(sent)
-    record_result(entry["user_id"], decision)
+    await record_result(entry["user_id"], decision)
     if decision:
         if entry.get("type") == "video":
-            new_ach = record_video(entry["user_id"])
+            new_ach = await record_video(entry["user_id"])
         else:
-            new_ach = record_meme(entry["user_id"])
+            new_ach = await record_meme(entry["user_id"])
         for ach in new_ach:
             sent_a = await callback.bot.send_message(entry["user_id"], f"Получено достижение: {ach}!")
             record_sent(sent_a)
@@ -11,14 +11,21 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
 from app.utils import (
+    record_message,
+    record_sent,
+    cleanup,
+    cached_ratings,
+    player_count,
+)
+from app.utils.aio import (
     get_tournament_ratings,
+    get_player_rank,
+    get_players_around,
+    get_elo_leaderboard,
     get_tournaments,
     get_tournament,
     add_participant,
     record_tournament,
-    record_message,
-    record_sent,
-    cleanup,
 )
 from app.constants import (
     TOURNAMENTS_BUTTON,
@@ -26,6 +33,8 @@ from app.constants import (
     RATING_BUTTON,
     SIGNUP_BUTTON,
     BACK_BUTTON,
+    GAMES,
+    LEVELS,
 )
 from . import start
 
@@ -77,7 +86,7 @@ async def tournaments_back(message: types.Message) -> None:
 async def show_tournaments(message: types.Message) -> None:
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    tournaments = get_tournaments()
+    tournaments = await get_tournaments()
     if not tournaments:
         sent = await message.answer("\u2753 Турниры не запланированы")
         record_sent(sent)
@@ -103,19 +112,67 @@ async def show_tournaments(message: types.Message) -> None:
 async def show_rating(message: types.Message) -> None:
     record_message(message)
     await cleanup(message.bot, message.chat.id)
-    ratings = get_tournament_ratings()
+    ratings = cached_ratings()
+    if ratings is None:
+        ratings = await get_tournament_ratings()
     if not ratings:
-        sent = await message.answer("\u2753 Рейтинг пока пуст.")
+        sent = await message.answer("\u2753 Рейтинг пока пуст.", reply_markup=_elo_kb())
         record_sent(sent)
         return
 
     lines = ["\U0001F3C6 Рейтинг игроков:"]
     for rank, name, score in ratings:
         lines.append(f"{rank}. {name} — {score}")
-    sent = await message.answer("\n".join(lines))
+    place = await get_player_rank(message.from_user.id)
+    if place is not None:
+        if place[0] > len(ratings):
+            around = await get_players_around(message.from_user.id)
+            around = [row for row in around if row[0] > len(ratings)]
+            if around and around[0][0] > len(ratings) + 1:
+                lines.append("…")
+            for rank, name, score in around:
+                lines.append(f"{rank}. {name} — {score}")
+        lines.append(f"\nВаше место: {place[0]} из {player_count()}")
+    sent = await message.answer("\n".join(lines), reply_markup=_elo_kb())
     record_sent(sent)
 
 
+def _elo_kb(game: int | None = None) -> InlineKeyboardMarkup:
+    """Buttons opening the Elo leaderboard of each game, or of each level of ``game``."""
+    if game is None:
+        buttons = [
+            InlineKeyboardButton(text=f"Elo {name}", callback_data=f"elo:{idx}")
+            for idx, name in enumerate(GAMES)
+        ]
+    else:
+        buttons = [
+            InlineKeyboardButton(text=level.split(": ", 1)[-1], callback_data=f"elo:{game}:{idx}")
+            for idx, level in enumerate(LEVELS)
+        ]
+        buttons.append(InlineKeyboardButton(text="Все уровни", callback_data=f"elo:{game}"))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+
+@router.callback_query(F.data.startswith("elo:"))
+async def cb_elo_rating(callback: types.CallbackQuery) -> None:
+    await cleanup(callback.bot, callback.message.chat.id)
+    game, *level = map(int, callback.data.split(":")[1:])
+    if level:
+        title = f"{GAMES[game]}, {LEVELS[level[0]].split(': ', 1)[-1]}"
+        ratings = await get_elo_leaderboard(GAMES[game], LEVELS[level[0]])
+    else:
+        title = GAMES[game]
+        ratings = await get_elo_leaderboard(GAMES[game])
+    lines = [f"\U0001F3C6 Рейтинг Elo — {title}:"]
+    for rank, name, rating, matches in ratings:
+        lines.append(f"{rank}. {name} — {rating} ({matches} матчей)")
+    if not ratings:
+        lines.append("Матчей пока не было.")
+    sent = await callback.message.answer("\n".join(lines), reply_markup=_elo_kb(game))
+    record_sent(sent)
+    await callback.answer()
+
+
 @router.callback_query(F.data.startswith("join_tour:"))
 async def cb_join_tournament(callback: types.CallbackQuery, state: FSMContext) -> None:
     await cleanup(callback.bot, callback.message.chat.id)
@@ -158,14 +215,14 @@ async def save_participant(message: types.Message, state: FSMContext) -> None:
         sent = await message.answer("Возраст должен быть числом. Попробуйте снова.")
         record_sent(sent)
         return
-    added = add_participant(
+    added = await add_participant(
         data.get("tid"),
         message.from_user.id,
         data.get("nickname"),
         age,
     )
     if added:
-        tour = get_tournament(data.get("tid"))
+        tour = await get_tournament(data.get("tid"))
         if tour:
             _, game, level, type_, date, *_ = tour
             text = f"Вы записаны на турнир {game} ({level}) {type_} — {date}!"
@@ -173,7 +230,7 @@ async def save_participant(message: types.Message, state: FSMContext) -> None:
             text = "Вы записаны на турнир!"
         sent = await message.answer(text, reply_markup=start.get_menu_kb(message.from_user.id))
         record_sent(sent)
-        new_ach = record_tournament(message.from_user.id)
+        new_ach = await record_tournament(message.from_user.id)
         for ach in new_ach:
             sent_a = await message.answer(f"Получено достижение: {ach}!")
             record_sent(sent_a)
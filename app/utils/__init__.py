@@ -1,3 +1,4 @@
+from .connection import connect, close_all
 from .database import (
     init_db,
     add_user,
@@ -7,9 +8,20 @@ from .database import (
     get_user_by_username,
     set_user_title,
     add_xp,
+    apply_user_batch,
     get_all_user_ids,
+    get_user_ids_page,
+    iter_user_ids,
+    has_role,
+    mark_blocked,
+    create_broadcast,
+    get_broadcast,
+    get_unfinished_broadcasts,
+    save_broadcast_progress,
     init_tournament_db,
     get_tournament_ratings,
+    cached_ratings,
+    invalidate_leaderboard,
     init_tournament_info_db,
     add_tournament,
     get_tournaments,
@@ -22,6 +34,7 @@ from .database import (
 )
 from .moderation import (
     init_moderation_db,
+    load_restrictions,
     add_banned_word,
     add_banned_link,
     add_warning,
@@ -38,9 +51,12 @@ from .moderation import (
     add_admin,
     remove_admin,
     get_admins,
+    is_admin,
     add_moderator,
     remove_moderator,
     get_moderators,
+    is_moderator,
+    load_roles,
 )
 from .modlog import (
     init_modlog_db,
@@ -50,8 +66,49 @@ from .modlog import (
     clear_strikes,
     get_mod_stats,
 )
+from .leaderboard import (
+    load_leaderboard,
+    set_score,
+    player_count,
+    get_player_rank,
+    get_players_around,
+)
+from .results import (
+    apply_results,
+    parse_results_csv,
+    import_results_csv,
+)
+from .elo import (
+    record_match,
+    recompute_ratings,
+    get_elo_leaderboard,
+)
+from .submissions import (
+    init_submissions_db,
+    load_awaiting,
+    add_submission,
+    get_submission,
+    awaiting_comment,
+    decide_submission,
+    finish_submission,
+    expire_submissions,
+    get_queue_stats,
+)
 
-from .history import record_message, record_sent, cleanup
+from .feedback_threads import (
+    init_feedback_db,
+    set_thread_ttl,
+    add_thread,
+    get_thread_user,
+    prune_threads,
+)
+from .history import (
+    record_message,
+    record_sent,
+    cleanup,
+    get_history_stats,
+    init_history_db,
+)
 from .achievements import (
     init_achievements_db,
     record_meme,
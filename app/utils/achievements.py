@@ -1,6 +1,9 @@
 import sqlite3
 from pathlib import Path
 
+from .connection import connect
+from .migrations import Step, migrate
+
 DB_PATH = Path(__file__).resolve().parent.parent / "achievements.db"
 
 
@@ -32,29 +35,29 @@ ACHIEVEMENTS = {
 }
 
 
+ACHIEVEMENTS_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS progress (
+        user_id INTEGER PRIMARY KEY,
+        memes INTEGER DEFAULT 0,
+        videos INTEGER DEFAULT 0,
+        tournaments INTEGER DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_achievements (
+        user_id INTEGER,
+        achievement TEXT,
+        PRIMARY KEY (user_id, achievement)
+    )
+    """,
+]
+
+
 def init_achievements_db() -> None:
     """Create tables for achievement progress and awards."""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS progress (
-                user_id INTEGER PRIMARY KEY,
-                memes INTEGER DEFAULT 0,
-                videos INTEGER DEFAULT 0,
-                tournaments INTEGER DEFAULT 0
-            )
-            """,
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS user_achievements (
-                user_id INTEGER,
-                achievement TEXT,
-                PRIMARY KEY (user_id, achievement)
-            )
-            """,
-        )
-        conn.commit()
+    with connect(DB_PATH) as conn:
+        migrate(conn, "achievements", ACHIEVEMENTS_MIGRATIONS)
 
 
 def _add_achievement(conn: sqlite3.Connection, user_id: int, name: str, emoji: str) -> bool:
@@ -74,7 +77,7 @@ def _add_achievement(conn: sqlite3.Connection, user_id: int, name: str, emoji: s
 
 
 def _increment(user_id: int, field: str) -> list[str]:
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         conn.execute(
             f"""INSERT INTO progress(user_id, {field}) VALUES(?, 1)
             ON CONFLICT(user_id) DO UPDATE SET {field}={field}+1""",
@@ -95,7 +98,6 @@ def _increment(user_id: int, field: str) -> list[str]:
             if counts[data["field"]] >= data["threshold"]:
                 if _add_achievement(conn, user_id, data["name"], data["emoji"]):
                     new_achs.append(f"{data['emoji']} {data['name']}")
-        conn.commit()
         return new_achs
 
 
@@ -116,7 +118,7 @@ def record_tournament(user_id: int) -> list[str]:
 
 def get_user_achievements(user_id: int) -> list[str]:
     """Return list of achievements for a user."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         cur = conn.execute(
             "SELECT achievement FROM user_achievements WHERE user_id=?",
             (user_id,),
@@ -0,0 +1,145 @@
+"""Awaitable mirrors of the database helpers for use inside handlers.
+
+Every function here has the same signature as its synchronous counterpart
+and runs it on the worker thread owning that helper's database file.
+"""
+import functools
+from types import ModuleType
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from . import (
+    achievements,
+    database,
+    elo,
+    feedback_threads,
+    leaderboard,
+    moderation,
+    modlog,
+    results,
+    spam,
+    submissions,
+)
+from .connection import run
+from .limiter import SQLiteLimiterBackend
+
+
+def _offload(module: ModuleType, path_attr: str, func: Callable) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run(getattr(module, path_attr), func, *args, **kwargs)
+
+    return wrapper
+
+
+# users.db
+add_user = _offload(database, "DB_PATH", database.add_user)
+increment_submission = _offload(database, "DB_PATH", database.increment_submission)
+record_result = _offload(database, "DB_PATH", database.record_result)
+get_user_stats = _offload(database, "DB_PATH", database.get_user_stats)
+get_user_by_username = _offload(database, "DB_PATH", database.get_user_by_username)
+set_user_title = _offload(database, "DB_PATH", database.set_user_title)
+add_xp = _offload(database, "DB_PATH", database.add_xp)
+apply_user_batch = _offload(database, "DB_PATH", database.apply_user_batch)
+get_all_user_ids = _offload(database, "DB_PATH", database.get_all_user_ids)
+get_user_ids_page = _offload(database, "DB_PATH", database.get_user_ids_page)
+mark_blocked = _offload(database, "DB_PATH", database.mark_blocked)
+create_broadcast = _offload(database, "DB_PATH", database.create_broadcast)
+get_broadcast = _offload(database, "DB_PATH", database.get_broadcast)
+get_unfinished_broadcasts = _offload(database, "DB_PATH", database.get_unfinished_broadcasts)
+save_broadcast_progress = _offload(database, "DB_PATH", database.save_broadcast_progress)
+
+
+async def iter_user_ids(
+    chunk_size: int = 1000,
+    after: int = 0,
+    active_since: int | None = None,
+    include_blocked: bool = False,
+    role: str | None = None,
+) -> AsyncIterator[list[int]]:
+    """Async counterpart of ``database.iter_user_ids``."""
+    while True:
+        ids = await get_user_ids_page(after, chunk_size, active_since, include_blocked, role)
+        if not ids:
+            return
+        after = ids[-1]
+        yield ids
+
+
+async def check_message_allowed(user_id: int, text: str) -> tuple[bool, str | None]:
+    """Async counterpart of ``spam.check_message_allowed``.
+
+    With the SQLite limiter backend the check runs on the worker thread of
+    its file; the in-memory backend is checked directly.
+    """
+    backend = spam.get_limiter_backend()
+    if isinstance(backend, SQLiteLimiterBackend):
+        return await run(backend.path, spam.check_message_allowed, user_id, text)
+    return spam.check_message_allowed(user_id, text)
+
+
+# tournaments.db
+get_tournament_ratings = _offload(database, "TOURNAMENT_DB_PATH", database.get_tournament_ratings)
+get_player_rank = _offload(database, "TOURNAMENT_DB_PATH", leaderboard.get_player_rank)
+get_players_around = _offload(database, "TOURNAMENT_DB_PATH", leaderboard.get_players_around)
+apply_results = _offload(database, "TOURNAMENT_DB_PATH", results.apply_results)
+import_results_csv = _offload(database, "TOURNAMENT_DB_PATH", results.import_results_csv)
+record_match = _offload(database, "TOURNAMENT_DB_PATH", elo.record_match)
+recompute_ratings = _offload(database, "TOURNAMENT_DB_PATH", elo.recompute_ratings)
+get_elo_leaderboard = _offload(database, "TOURNAMENT_DB_PATH", elo.get_elo_leaderboard)
+
+# tournaments_info.db
+add_tournament = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.add_tournament)
+get_tournaments = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.get_tournaments)
+get_tournament = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.get_tournament)
+update_tournament = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.update_tournament)
+delete_tournament = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.delete_tournament)
+add_participant = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.add_participant)
+get_participants = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.get_participants)
+remove_participant = _offload(database, "TOURNAMENT_INFO_DB_PATH", database.remove_participant)
+
+# moderation.db
+add_banned_word = _offload(moderation, "MOD_DB_PATH", moderation.add_banned_word)
+add_banned_link = _offload(moderation, "MOD_DB_PATH", moderation.add_banned_link)
+add_warning = _offload(moderation, "MOD_DB_PATH", moderation.add_warning)
+get_warnings = _offload(moderation, "MOD_DB_PATH", moderation.get_warnings)
+clear_warnings = _offload(moderation, "MOD_DB_PATH", moderation.clear_warnings)
+mute_user = _offload(moderation, "MOD_DB_PATH", moderation.mute_user)
+unmute_user = _offload(moderation, "MOD_DB_PATH", moderation.unmute_user)
+is_muted = _offload(moderation, "MOD_DB_PATH", moderation.is_muted)
+ban_user = _offload(moderation, "MOD_DB_PATH", moderation.ban_user)
+unban_user = _offload(moderation, "MOD_DB_PATH", moderation.unban_user)
+is_banned = _offload(moderation, "MOD_DB_PATH", moderation.is_banned)
+get_all_mutes = _offload(moderation, "MOD_DB_PATH", moderation.get_all_mutes)
+get_all_bans = _offload(moderation, "MOD_DB_PATH", moderation.get_all_bans)
+add_admin = _offload(moderation, "MOD_DB_PATH", moderation.add_admin)
+remove_admin = _offload(moderation, "MOD_DB_PATH", moderation.remove_admin)
+get_admins = _offload(moderation, "MOD_DB_PATH", moderation.get_admins)
+add_moderator = _offload(moderation, "MOD_DB_PATH", moderation.add_moderator)
+remove_moderator = _offload(moderation, "MOD_DB_PATH", moderation.remove_moderator)
+get_moderators = _offload(moderation, "MOD_DB_PATH", moderation.get_moderators)
+
+# moderation_log.db
+log_action = _offload(modlog, "LOG_DB_PATH", modlog.log_action)
+add_strike = _offload(modlog, "LOG_DB_PATH", modlog.add_strike)
+get_strikes = _offload(modlog, "LOG_DB_PATH", modlog.get_strikes)
+clear_strikes = _offload(modlog, "LOG_DB_PATH", modlog.clear_strikes)
+get_mod_stats = _offload(modlog, "LOG_DB_PATH", modlog.get_mod_stats)
+
+# submissions.db
+add_submission = _offload(submissions, "SUBMISSIONS_DB_PATH", submissions.add_submission)
+get_submission = _offload(submissions, "SUBMISSIONS_DB_PATH", submissions.get_submission)
+decide_submission = _offload(submissions, "SUBMISSIONS_DB_PATH", submissions.decide_submission)
+finish_submission = _offload(submissions, "SUBMISSIONS_DB_PATH", submissions.finish_submission)
+expire_submissions = _offload(submissions, "SUBMISSIONS_DB_PATH", submissions.expire_submissions)
+get_queue_stats = _offload(submissions, "SUBMISSIONS_DB_PATH", submissions.get_queue_stats)
+
+# feedback.db
+add_thread = _offload(feedback_threads, "FEEDBACK_DB_PATH", feedback_threads.add_thread)
+get_thread_user = _offload(feedback_threads, "FEEDBACK_DB_PATH", feedback_threads.get_thread_user)
+prune_threads = _offload(feedback_threads, "FEEDBACK_DB_PATH", feedback_threads.prune_threads)
+
+# achievements.db
+record_meme = _offload(achievements, "DB_PATH", achievements.record_meme)
+record_video = _offload(achievements, "DB_PATH", achievements.record_video)
+record_tournament = _offload(achievements, "DB_PATH", achievements.record_tournament)
+get_user_achievements = _offload(achievements, "DB_PATH", achievements.get_user_achievements)
@@ -0,0 +1,194 @@
+"""Database layout: one consolidated file or the historical per-domain files.
+
+In ``single`` mode (the default) the domain databases listed in
+``domain_paths`` are routed to one file, ``app/bot.db``. Cross-domain writes
+such as a warning with its log entry and strike then commit in one
+transaction, and queries can JOIN users with ratings. Data found in the old
+per-domain files is copied into the new file once; the old files are left
+untouched. In ``separate`` mode every domain keeps its own file; the users
+database is attached to the tournaments connection and the moderation
+database to the users connection for JOINs.
+
+``bootstrap`` prepares everything at startup: it reads the schema versions
+of each file with one query, runs only pending migrations, imports legacy
+data and fills the in-memory caches, including the leaderboard, timing
+each phase.
+"""
+import logging
+import time
+from pathlib import Path
+
+from . import achievements, database, feedback_threads, leaderboard, moderation, modlog, submissions
+from .connection import attach, connect, resolve, route
+from .migrations import migrate
+
+MAIN_DB_PATH = Path(__file__).resolve().parent.parent / "bot.db"
+
+logger = logging.getLogger(__name__)
+
+# component -> (module, attribute with its database path, attribute with its migrations)
+COMPONENTS = {
+    "users": (database, "DB_PATH", "USERS_MIGRATIONS"),
+    "tournaments": (database, "TOURNAMENT_DB_PATH", "TOURNAMENT_MIGRATIONS"),
+    "tournaments_info": (database, "TOURNAMENT_INFO_DB_PATH", "TOURNAMENT_INFO_MIGRATIONS"),
+    "moderation": (moderation, "MOD_DB_PATH", "MODERATION_MIGRATIONS"),
+    "modlog": (modlog, "LOG_DB_PATH", "MODLOG_MIGRATIONS"),
+    "achievements": (achievements, "DB_PATH", "ACHIEVEMENTS_MIGRATIONS"),
+    "submissions": (submissions, "SUBMISSIONS_DB_PATH", "SUBMISSIONS_MIGRATIONS"),
+    "feedback": (feedback_threads, "FEEDBACK_DB_PATH", "FEEDBACK_MIGRATIONS"),
+}
+
+
+def domain_paths() -> list[Path]:
+    """Database files consolidated in ``single`` mode."""
+    return [getattr(module, path_attr) for module, path_attr, _ in COMPONENTS.values()]
+
+
+def configure_databases(mode: str = "single", path: str | Path | None = None) -> Path | None:
+    """Set up the layout before any database is opened.
+
+    Returns the consolidated file in ``single`` mode and None otherwise.
+    """
+    if mode == "single":
+        target = Path(path or MAIN_DB_PATH)
+        route(domain_paths(), target)
+        return target
+    if mode == "separate":
+        attach(database.TOURNAMENT_DB_PATH, "users_db", database.DB_PATH)
+        attach(database.DB_PATH, "moderation_db", moderation.MOD_DB_PATH)
+        return None
+    raise ValueError(f"Unknown database mode: {mode}")
+
+
+def _columns(conn, schema: str, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info("{table}")')]
+
+
+def _copy_tables(conn) -> int:
+    copied = 0
+    tables = conn.execute(
+        """
+        SELECT name FROM legacy.sqlite_master
+        WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name != 'schema_versions'
+        """
+    ).fetchall()
+    for (table,) in tables:
+        target = set(_columns(conn, "main", table))
+        if not target:
+            logger.warning("Skipping unknown legacy table %s", table)
+            continue
+        columns = ", ".join(f'"{c}"' for c in _columns(conn, "legacy", table) if c in target)
+        copied += conn.execute(
+            f'INSERT OR IGNORE INTO main."{table}"({columns}) '
+            f'SELECT {columns} FROM legacy."{table}"'
+        ).rowcount
+    return copied
+
+
+def import_legacy(target: str | Path) -> int:
+    """Copy rows from the per-domain files into ``target`` once per file.
+
+    Run after the schema of ``target`` is initialized; returns copied rows.
+    """
+    total = 0
+    with connect(target) as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS legacy_imports(
+                path TEXT PRIMARY KEY,
+                rows INTEGER,
+                imported INTEGER
+            )
+            """
+        )
+        conn.commit()
+        for path in dict.fromkeys(domain_paths()):
+            if path == Path(target) or not path.exists():
+                continue
+            done = conn.execute(
+                "SELECT 1 FROM legacy_imports WHERE path=?", (str(path),)
+            ).fetchone()
+            if done:
+                continue
+            start = time.perf_counter()
+            # ATTACH is not allowed inside a transaction
+            conn.execute("ATTACH DATABASE ? AS legacy", (str(path),))
+            try:
+                with conn:
+                    rows = _copy_tables(conn)
+                    conn.execute(
+                        "INSERT INTO legacy_imports(path, rows, imported) VALUES(?, ?, ?)",
+                        (str(path), rows, int(time.time())),
+                    )
+            finally:
+                conn.execute("DETACH DATABASE legacy")
+            logger.info(
+                "Imported %d rows from %s in %.1f ms",
+                rows, path.name, (time.perf_counter() - start) * 1000,
+            )
+            total += rows
+    if total:
+        # caches were filled from the still empty tables
+        moderation.load_restrictions()
+        moderation.load_roles()
+        submissions.load_awaiting()
+        leaderboard.load_leaderboard()
+        database.invalidate_leaderboard()
+    return total
+
+
+def _read_versions(conn) -> dict[str, int]:
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_versions'"
+    ).fetchone()
+    if not exists:
+        return {}
+    return dict(conn.execute("SELECT component, version FROM schema_versions"))
+
+
+def migrate_all() -> int:
+    """Run pending migrations of every component and return the applied steps.
+
+    Files whose components are all up to date are only read, never written.
+    """
+    by_file: dict[str, list[str]] = {}
+    for name, (module, path_attr, _) in COMPONENTS.items():
+        by_file.setdefault(resolve(getattr(module, path_attr)), []).append(name)
+    applied = 0
+    for path, names in by_file.items():
+        with connect(path) as conn:
+            versions = _read_versions(conn)
+            for name in names:
+                module, _, steps_attr = COMPONENTS[name]
+                steps = getattr(module, steps_attr)
+                if versions.get(name, 0) != len(steps):
+                    applied += migrate(conn, name, steps)
+    return applied
+
+
+def bootstrap(mode: str = "single", path: str | Path | None = None) -> dict:
+    """Prepare all domain databases and return a startup report.
+
+    Replaces calling every ``init_*`` function; timings are in milliseconds.
+    """
+    report: dict = {}
+    start = last = time.perf_counter()
+
+    def lap(phase: str) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        report[f"{phase}_ms"] = round((now - last) * 1000, 2)
+        last = now
+
+    target = configure_databases(mode, path)
+    report["migrations"] = migrate_all()
+    lap("schema")
+    report["imported_rows"] = import_legacy(target) if target is not None else 0
+    lap("legacy_import")
+    moderation.load_restrictions()
+    moderation.load_roles()
+    submissions.load_awaiting()
+    report["ranked_players"] = leaderboard.load_leaderboard()
+    lap("caches")
+    report["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return report
@@ -0,0 +1,157 @@
+"""Rate-limited, resumable broadcasts to all bot users.
+
+Recipients are walked in user id order in chunks of ``CHUNK_SIZE``. Sends
+within a chunk run concurrently (at most ``CONCURRENCY`` at a time) with
+broadcast priority, so the outbound dispatcher paces and retries them behind
+interactive traffic. The broadcast has no pacing of its own and refuses to
+start on a bot without ``setup_outbound``. After every chunk
+the position is saved, so a restarted bot resumes where it stopped and
+re-sends at most one chunk. Users who blocked the bot are flagged and
+skipped by later broadcasts.
+"""
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from .aio import (
+    create_broadcast,
+    get_broadcast,
+    get_unfinished_broadcasts,
+    iter_user_ids,
+    mark_blocked,
+    save_broadcast_progress,
+)
+from .outbound import OutboundDispatcher, Priority, priority
+
+CONCURRENCY = 10  # sends in flight at once
+CHUNK_SIZE = 100  # recipients per persisted progress step
+PROGRESS_EDIT_INTERVAL = 5.0  # seconds between progress message edits
+
+logger = logging.getLogger(__name__)
+
+_tasks: dict[int, asyncio.Task] = {}
+
+
+async def _deliver(bot: Bot, user_id: int, text: str) -> str:
+    """Send one message and return "sent", "dead" or "failed".
+
+    Pacing and retries happen in the outbound dispatcher; an error reaching
+    this point is final.
+    """
+    try:
+        await bot.send_message(user_id, text)
+    except TelegramForbiddenError:
+        return "dead"
+    except TelegramBadRequest as e:
+        if "chat not found" in e.message.lower():
+            return "dead"
+        return "failed"
+    except Exception:
+        logger.debug("Broadcast send to %s failed", user_id, exc_info=True)
+        return "failed"
+    return "sent"
+
+
+def _progress_text(data: dict, done: bool) -> str:
+    header = "Рассылка завершена" if done else "Рассылка идёт…"
+    return (
+        f"{header}\n"
+        f"Отправлено: {data['sent']}\n"
+        f"Ошибок: {data['failed']}\n"
+        f"Заблокировали бота: {data['dead']}"
+    )
+
+
+async def _report(bot: Bot, data: dict, done: bool) -> None:
+    try:
+        await bot.edit_message_text(
+            _progress_text(data, done),
+            chat_id=data["chat_id"],
+            message_id=data["message_id"],
+        )
+    except Exception:
+        logger.debug("Could not update broadcast progress", exc_info=True)
+
+
+async def _run(bot: Bot, broadcast_id: int) -> None:
+    data = await get_broadcast(broadcast_id)
+    if not data or data["finished"]:
+        return
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def send(user_id: int) -> str:
+        async with semaphore:
+            return await _deliver(bot, user_id, data["text"])
+
+    last_report = time.monotonic()
+    async for ids in iter_user_ids(CHUNK_SIZE, after=data["last_user_id"]):
+        results = await asyncio.gather(*(send(uid) for uid in ids))
+        dead = [uid for uid, result in zip(ids, results) if result == "dead"]
+        if dead:
+            await mark_blocked(dead)
+        data["sent"] += results.count("sent")
+        data["failed"] += results.count("failed")
+        data["dead"] += len(dead)
+        data["last_user_id"] = ids[-1]
+        await save_broadcast_progress(
+            broadcast_id, data["last_user_id"], data["sent"], data["failed"], data["dead"]
+        )
+        if time.monotonic() - last_report >= PROGRESS_EDIT_INTERVAL:
+            last_report = time.monotonic()
+            await _report(bot, data, done=False)
+
+    await save_broadcast_progress(
+        broadcast_id,
+        data["last_user_id"],
+        data["sent"],
+        data["failed"],
+        data["dead"],
+        finished=True,
+    )
+    await _report(bot, data, done=True)
+    logger.info(
+        "Broadcast %s finished: %s sent, %s failed, %s dead",
+        broadcast_id, data["sent"], data["failed"], data["dead"],
+    )
+
+
+def _check_dispatcher(bot: Bot) -> None:
+    if not any(isinstance(m, OutboundDispatcher) for m in bot.session.middleware):
+        raise RuntimeError("Broadcasts need the outbound dispatcher, call setup_outbound(bot) first")
+
+
+def _spawn(bot: Bot, broadcast_id: int) -> None:
+    # the task inherits the priority, so its sends yield to interactive traffic
+    with priority(Priority.BROADCAST):
+        task = asyncio.get_running_loop().create_task(_run(bot, broadcast_id))
+    _tasks[broadcast_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(broadcast_id, None))
+
+
+async def start_broadcast(bot: Bot, text: str, chat_id: int) -> int:
+    """Begin a broadcast reporting progress to ``chat_id``; return its id."""
+    _check_dispatcher(bot)
+    status = await bot.send_message(chat_id, "Рассылка запускается…")
+    broadcast_id = await create_broadcast(text, chat_id, status.message_id)
+    _spawn(bot, broadcast_id)
+    return broadcast_id
+
+
+async def resume_broadcasts(bot: Bot) -> None:
+    """Continue broadcasts interrupted by a restart."""
+    _check_dispatcher(bot)
+    for broadcast_id in await get_unfinished_broadcasts():
+        if broadcast_id not in _tasks:
+            logger.info("Resuming broadcast %s", broadcast_id)
+            _spawn(bot, broadcast_id)
+
+
+async def stop_broadcasts() -> None:
+    """Cancel running broadcasts; they resume on the next start."""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
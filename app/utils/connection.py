@@ -0,0 +1,160 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Pragmas applied to every pooled connection
+JOURNAL_MODE = "WAL"
+SYNCHRONOUS = "NORMAL"
+CACHE_SIZE = -8000  # negative value is KiB, ~8 MB page cache per database
+# Size of sqlite3's per-connection prepared statement cache
+STATEMENT_CACHE_SIZE = 256
+
+
+class _Entry:
+    """Long-lived connection with the lock serializing access to it."""
+
+    __slots__ = ("conn", "lock", "depth")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.lock = threading.RLock()
+        self.depth = 0
+
+
+_pool: dict[str, _Entry] = {}
+_pool_lock = threading.Lock()
+_workers: dict[str, ThreadPoolExecutor] = {}
+# path -> database file actually serving it, see route()
+_routes: dict[str, str] = {}
+# database file -> {schema name: file} attached to its connection
+_attachments: dict[str, dict[str, str]] = {}
+
+
+def route(paths: Iterable[str | Path], target: str | Path) -> None:
+    """Serve every path in ``paths`` from the ``target`` file.
+
+    Call before the paths are first used. Modules keep their own path
+    constants; routed paths share one connection, worker and transaction.
+    """
+    for path in paths:
+        _routes[str(path)] = str(target)
+
+
+def attach(path: str | Path, schema: str, other: str | Path) -> None:
+    """Attach ``other`` as ``schema`` whenever ``path`` is opened.
+
+    Unqualified table names also resolve to attached databases, so queries
+    can JOIN tables living in different files. Attaching the same file
+    under the same schema again does nothing; a schema name already bound
+    to another file raises ValueError.
+    """
+    schemas = _attachments.setdefault(resolve(path), {})
+    other = resolve(other)
+    current = schemas.setdefault(schema, other)
+    if current != other:
+        raise ValueError(f"Schema {schema} of {resolve(path)} is already attached to {current}, not {other}")
+
+
+def resolve(path: str | Path) -> str:
+    """Return the database file serving ``path``."""
+    key = str(path)
+    return _routes.get(key, key)
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size={CACHE_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    for schema, other in _attachments.get(path, {}).items():
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (other,))
+        conn.execute(f"PRAGMA {schema}.journal_mode={JOURNAL_MODE}")
+    return conn
+
+
+def _get_entry(path: str | Path) -> _Entry:
+    key = resolve(path)
+    entry = _pool.get(key)
+    if entry is None:
+        with _pool_lock:
+            entry = _pool.get(key)
+            if entry is None:
+                entry = _Entry(_open(key))
+                _pool[key] = entry
+    return entry
+
+
+@contextmanager
+def connect(path: str | Path) -> Iterator[sqlite3.Connection]:
+    """Borrow the pooled connection for a database file.
+
+    Behaves like ``with sqlite3.connect(path) as conn``: the transaction is
+    committed when the block succeeds and rolled back on error. Nested blocks
+    on the same database join the outermost transaction.
+    """
+    entry = _get_entry(path)
+    with entry.lock:
+        entry.depth += 1
+        try:
+            yield entry.conn
+        except BaseException:
+            entry.depth -= 1
+            if entry.depth == 0:
+                entry.conn.rollback()
+            raise
+        entry.depth -= 1
+        if entry.depth == 0:
+            entry.conn.commit()
+
+
+def _get_worker(path: str | Path) -> ThreadPoolExecutor:
+    key = resolve(path)
+    worker = _workers.get(key)
+    if worker is None:
+        with _pool_lock:
+            worker = _workers.get(key)
+            if worker is None:
+                worker = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"db-{Path(key).stem}"
+                )
+                _workers[key] = worker
+    return worker
+
+
+async def run(path: str | Path, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking database helper on the worker thread of ``path``.
+
+    Every database file has a single dedicated thread, so calls for the same
+    file are executed in submission order without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_worker(path), functools.partial(func, *args, **kwargs)
+    )
+
+
+def close_all() -> None:
+    """Stop database workers and close every pooled connection (used on shutdown)."""
+    with _pool_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.shutdown(wait=True)
+    with _pool_lock:
+        entries = list(_pool.values())
+        _pool.clear()
+    for entry in entries:
+        with entry.lock:
+            entry.conn.close()
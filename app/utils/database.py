@@ -1,64 +1,89 @@
 import sqlite3
+import time
 from pathlib import Path
+from typing import Iterator
 from aiogram.types import User
 
+from .connection import connect
+from .migrations import Step, add_column, migrate
+from .moderation import is_admin, is_moderator
+
 DB_PATH = Path(__file__).resolve().parent.parent / "users.db"
 
 
+USERS_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        name TEXT,
+        username TEXT,
+        title TEXT DEFAULT '',
+        xp INTEGER DEFAULT 0,
+        sent_total INTEGER DEFAULT 0,
+        sent_approved INTEGER DEFAULT 0,
+        sent_rejected INTEGER DEFAULT 0
+    )
+    """,
+    add_column("users", "title", "TEXT DEFAULT ''"),
+    # users who blocked the bot are skipped by broadcasts
+    add_column("users", "blocked", "INTEGER DEFAULT 0"),
+    add_column("users", "last_seen", "INTEGER DEFAULT 0"),
+    """
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT,
+        chat_id INTEGER,
+        message_id INTEGER,
+        last_user_id INTEGER DEFAULT 0,
+        sent INTEGER DEFAULT 0,
+        failed INTEGER DEFAULT 0,
+        dead INTEGER DEFAULT 0,
+        started INTEGER,
+        finished INTEGER DEFAULT 0
+    )
+    """,
+    # get_user_by_username compares lower(username)
+    "CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username))",
+]
+
+
 def init_db() -> None:
-    """Initialize the database and create tables if needed."""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                name TEXT,
-                username TEXT,
-                title TEXT DEFAULT '',
-                xp INTEGER DEFAULT 0,
-                sent_total INTEGER DEFAULT 0,
-                sent_approved INTEGER DEFAULT 0,
-                sent_rejected INTEGER DEFAULT 0
-            )
-            """
-        )
-        # add missing column for older databases
-        try:
-            conn.execute("ALTER TABLE users ADD COLUMN title TEXT DEFAULT ''")
-        except sqlite3.OperationalError:
-            pass
-        conn.commit()
+    """Initialize the database and apply pending migrations."""
+    with connect(DB_PATH) as conn:
+        migrate(conn, "users", USERS_MIGRATIONS)
 
 
 def add_user(user: User) -> None:
     """Insert or update user basic information."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         conn.execute(
             """
-            INSERT INTO users(user_id, name, username)
-            VALUES(?, ?, ?)
+            INSERT INTO users(user_id, name, username, last_seen)
+            VALUES(?, ?, ?, ?)
             ON CONFLICT(user_id) DO UPDATE SET
                 name=excluded.name,
-                username=excluded.username
+                username=excluded.username,
+                last_seen=excluded.last_seen,
+                blocked=0
             """,
-            (user.id, user.full_name, user.username or ""),
+            (user.id, user.full_name, user.username or "", int(time.time())),
         )
-        conn.commit()
+    if _leaderboard_names.get(user.id, user.full_name) != user.full_name:
+        invalidate_leaderboard()
 
 
 def increment_submission(user_id: int) -> None:
     """Increase total submissions count."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         conn.execute(
             "UPDATE users SET sent_total = sent_total + 1 WHERE user_id=?",
             (user_id,),
         )
-        conn.commit()
 
 
 def record_result(user_id: int, approved: bool) -> None:
     """Record moderation result and award XP if approved."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         if approved:
             conn.execute(
                 """
@@ -74,33 +99,61 @@ def record_result(user_id: int, approved: bool) -> None:
                 "UPDATE users SET sent_rejected = sent_rejected + 1 WHERE user_id=?",
                 (user_id,),
             )
-        conn.commit()
 
 
 def add_xp(user_id: int, amount: int) -> None:
     """Increase user's XP by the given amount."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         conn.execute(
             "UPDATE users SET xp = xp + ? WHERE user_id=?",
             (amount, user_id),
         )
-        conn.commit()
+
+
+def apply_user_batch(profiles: dict[int, tuple[str, str]], xp: dict[int, int]) -> None:
+    """Upsert many user profiles and add XP for many users in one transaction.
+
+    ``profiles`` maps user id to ``(name, username)``, ``xp`` maps user id to
+    the XP amount to add.
+    """
+    now = int(time.time())
+    with connect(DB_PATH) as conn:
+        conn.executemany(
+            """
+            INSERT INTO users(user_id, name, username, last_seen)
+            VALUES(?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                name=excluded.name,
+                username=excluded.username,
+                last_seen=excluded.last_seen,
+                blocked=0
+            """,
+            [(uid, name, username, now) for uid, (name, username) in profiles.items()],
+        )
+        conn.executemany(
+            "UPDATE users SET xp = xp + ? WHERE user_id=?",
+            [(amount, uid) for uid, amount in xp.items()],
+        )
+    if any(_leaderboard_names.get(uid, name) != name for uid, (name, _) in profiles.items()):
+        invalidate_leaderboard()
 
 
 def get_user_stats(user_id: int) -> dict | None:
     """Return statistics for a user."""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.execute("SELECT * FROM users WHERE user_id=?", (user_id,))
+    with connect(DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.row_factory = sqlite3.Row
+        cur.execute("SELECT * FROM users WHERE user_id=?", (user_id,))
         row = cur.fetchone()
         return dict(row) if row else None
 
 
 def get_user_by_username(username: str) -> dict | None:
     """Return user stats by username (case-insensitive)."""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.execute(
+    with connect(DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.row_factory = sqlite3.Row
+        cur.execute(
             "SELECT * FROM users WHERE lower(username)=?",
             (username.lower(),),
         )
@@ -110,123 +163,310 @@ def get_user_by_username(username: str) -> dict | None:
 
 def set_user_title(user_id: int, title: str) -> None:
     """Assign custom title to the user."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         conn.execute(
             "UPDATE users SET title=? WHERE user_id=?",
             (title, user_id),
         )
-        conn.commit()
 
 
 def get_all_user_ids() -> list[int]:
     """Return list of all user IDs."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH) as conn:
         cur = conn.execute("SELECT user_id FROM users")
         return [row[0] for row in cur.fetchall()]
 
-TOURNAMENT_DB_PATH = Path(__file__).resolve().parent.parent / "tournaments.db"
 
+# role name -> tables of moderation.db granting it, see has_role
+ROLE_TABLES = {
+    "admin": ("admins",),
+    "moderator": ("moderators",),
+    "staff": ("admins", "moderators"),
+}
+
+
+def get_user_ids_page(
+    after: int,
+    limit: int,
+    active_since: int | None = None,
+    include_blocked: bool = False,
+    role: str | None = None,
+) -> list[int]:
+    """Return up to ``limit`` user ids greater than ``after`` in id order.
+
+    ``active_since`` keeps users seen at or after that unix time, blocked
+    users are skipped unless ``include_blocked`` is set and ``role`` keeps
+    only users holding that role.
+    """
+    query = "SELECT user_id FROM users WHERE user_id > ?"
+    params: list = [after]
+    if active_since is not None:
+        query += " AND last_seen >= ?"
+        params.append(active_since)
+    if not include_blocked:
+        query += " AND blocked = 0"
+    if role is not None:
+        if role not in ROLE_TABLES:
+            raise ValueError(f"Unknown role: {role}")
+        query += " AND (" + " OR ".join(
+            f"user_id IN (SELECT user_id FROM {table})" for table in ROLE_TABLES[role]
+        ) + ")"
+    query += " ORDER BY user_id LIMIT ?"
+    params.append(limit)
+    with connect(DB_PATH) as conn:
+        cur = conn.execute(query, params)
+        return [row[0] for row in cur.fetchall()]
 
-def init_tournament_db() -> None:
-    """Create table for tournament ratings if it doesn't exist."""
-    with sqlite3.connect(TOURNAMENT_DB_PATH) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ratings (
-                user_id INTEGER PRIMARY KEY,
-                score INTEGER DEFAULT 0
-            )
-            """
+
+def has_role(user_id: int, role: str) -> bool:
+    """Check role by name: "admin", "moderator" or "staff" (either of them)."""
+    if role == "admin":
+        return is_admin(user_id)
+    if role == "moderator":
+        return is_moderator(user_id)
+    if role == "staff":
+        return is_admin(user_id) or is_moderator(user_id)
+    raise ValueError(f"Unknown role: {role}")
+
+
+def iter_user_ids(
+    chunk_size: int = 1000,
+    after: int = 0,
+    active_since: int | None = None,
+    include_blocked: bool = False,
+    role: str | None = None,
+) -> Iterator[list[int]]:
+    """Yield user ids in ascending chunks without loading the whole table.
+
+    Pages are fetched by keyset (``user_id > last seen id``), so memory use is
+    bounded by ``chunk_size`` and each page costs one index range scan.
+    """
+    while True:
+        ids = get_user_ids_page(after, chunk_size, active_since, include_blocked, role)
+        if not ids:
+            return
+        after = ids[-1]
+        yield ids
+
+
+def mark_blocked(user_ids: list[int]) -> None:
+    """Flag users who blocked the bot so broadcasts skip them."""
+    with connect(DB_PATH) as conn:
+        conn.executemany(
+            "UPDATE users SET blocked = 1 WHERE user_id=?",
+            [(uid,) for uid in user_ids],
         )
-        conn.commit()
 
 
-def get_tournament_ratings(limit: int = 10) -> list[tuple]:
-    """Return top players with their scores."""
-    with sqlite3.connect(TOURNAMENT_DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
+def create_broadcast(text: str, chat_id: int, message_id: int) -> int:
+    """Store a new broadcast and return its id."""
+    with connect(DB_PATH) as conn:
         cur = conn.execute(
-            "SELECT user_id, score FROM ratings ORDER BY score DESC LIMIT ?",
-            (limit,),
+            """
+            INSERT INTO broadcasts(text, chat_id, message_id, started)
+            VALUES(?, ?, ?, ?)
+            """,
+            (text, chat_id, message_id, int(time.time())),
         )
-        rows = cur.fetchall()
+        return cur.lastrowid
 
-    results = []
-    for idx, row in enumerate(rows, 1):
-        user = get_user_stats(row["user_id"])
-        name = user.get("name") if user else f"User {row['user_id']}"
-        results.append((idx, name, row["score"]))
-    return results
 
+def get_broadcast(broadcast_id: int) -> dict | None:
+    """Return broadcast with its progress."""
+    with connect(DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.row_factory = sqlite3.Row
+        cur.execute("SELECT * FROM broadcasts WHERE id=?", (broadcast_id,))
+        row = cur.fetchone()
+        return dict(row) if row else None
 
-TOURNAMENT_INFO_DB_PATH = Path(__file__).resolve().parent.parent / "tournaments_info.db"
 
+def get_unfinished_broadcasts() -> list[int]:
+    """Return ids of broadcasts interrupted before completion."""
+    with connect(DB_PATH) as conn:
+        cur = conn.execute("SELECT id FROM broadcasts WHERE finished=0 ORDER BY id")
+        return [row[0] for row in cur.fetchall()]
 
-def init_tournament_info_db() -> None:
-    """Create table for tournament info."""
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+
+def save_broadcast_progress(
+    broadcast_id: int, last_user_id: int, sent: int, failed: int, dead: int, finished: bool = False
+) -> None:
+    """Persist how far a broadcast has got."""
+    with connect(DB_PATH) as conn:
         conn.execute(
             """
-            CREATE TABLE IF NOT EXISTS tournaments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game TEXT,
-                level TEXT,
-                type TEXT,
-                date TEXT,
-                prize TEXT,
-                preview TEXT
-            )
-            """
+            UPDATE broadcasts
+            SET last_user_id=?, sent=?, failed=?, dead=?, finished=?
+            WHERE id=?
+            """,
+            (last_user_id, sent, failed, dead, int(time.time()) if finished else 0, broadcast_id),
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS participants (
-                tournament_id INTEGER,
-                user_id INTEGER,
-                nickname TEXT,
-                age INTEGER,
-                PRIMARY KEY (tournament_id, user_id)
-            )
+
+TOURNAMENT_DB_PATH = Path(__file__).resolve().parent.parent / "tournaments.db"
+
+
+TOURNAMENT_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS ratings (
+        user_id INTEGER PRIMARY KEY,
+        score INTEGER DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ratings_score ON ratings(score DESC, user_id)",
+    # applied result batches, see results.apply_results
+    """
+    CREATE TABLE IF NOT EXISTS result_batches (
+        key TEXT PRIMARY KEY,
+        tournament_id INTEGER,
+        entries INTEGER,
+        applied INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS results (
+        batch TEXT,
+        user_id INTEGER,
+        placement INTEGER,
+        delta INTEGER
+    )
+    """,
+    # match history and Elo ratings, see elo.py
+    """
+    CREATE TABLE IF NOT EXISTS matches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tournament_id INTEGER,
+        game TEXT NOT NULL,
+        level TEXT NOT NULL,
+        winner_id INTEGER,
+        loser_id INTEGER,
+        draw INTEGER DEFAULT 0,
+        played INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS elo_ratings (
+        game TEXT NOT NULL,
+        level TEXT NOT NULL,
+        user_id INTEGER,
+        rating REAL,
+        matches INTEGER DEFAULT 0,
+        PRIMARY KEY (game, level, user_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_elo_ratings_board ON elo_ratings(game, level, rating DESC)",
+    # replaying a level reads its matches in order from the index alone
+    """
+    CREATE INDEX IF NOT EXISTS idx_matches_game_level
+    ON matches(game, level, id, winner_id, loser_id, draw)
+    """,
+]
+
+
+def init_tournament_db() -> None:
+    """Create table for tournament ratings if it doesn't exist."""
+    with connect(TOURNAMENT_DB_PATH) as conn:
+        migrate(conn, "tournaments", TOURNAMENT_MIGRATIONS)
+
+
+LEADERBOARD_SIZE = 100  # top players kept in memory
+
+# (rank, name, score) of the top LEADERBOARD_SIZE players, None until loaded
+_leaderboard: list[tuple] | None = None
+# user_id -> name of the players in ``_leaderboard``
+_leaderboard_names: dict[int, str] = {}
+
+
+def invalidate_leaderboard() -> None:
+    """Forget the cached top players after scores or their names changed."""
+    global _leaderboard
+    _leaderboard = None
+
+
+def _query_ratings(limit: int) -> list[tuple]:
+    # users live in the same file or are attached to the tournaments connection
+    with connect(TOURNAMENT_DB_PATH) as conn:
+        rows = conn.execute(
             """
-        )
-        # try to add missing columns for older versions
-        try:
-            conn.execute("ALTER TABLE participants ADD COLUMN nickname TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            conn.execute("ALTER TABLE participants ADD COLUMN age INTEGER")
-        except sqlite3.OperationalError:
-            pass
-        # try to add missing columns for older versions
-        try:
-            conn.execute("ALTER TABLE tournaments ADD COLUMN level TEXT")
-        except sqlite3.OperationalError:
-            pass
-        # try to add missing column "prize" for older versions
-        try:
-            conn.execute("ALTER TABLE tournaments ADD COLUMN prize TEXT")
-        except sqlite3.OperationalError:
-            pass
-        # try to add missing column "preview" for older versions
-        try:
-            conn.execute("ALTER TABLE tournaments ADD COLUMN preview TEXT")
-        except sqlite3.OperationalError:
-            pass
-        conn.commit()
+            SELECT r.user_id, COALESCE(u.name, 'User ' || r.user_id), r.score
+            FROM ratings r LEFT JOIN users u ON u.user_id = r.user_id
+            ORDER BY r.score DESC, r.user_id LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    return rows
+
+
+def cached_ratings(limit: int = 10) -> list[tuple] | None:
+    """Return top players from memory, or None if they have to be loaded."""
+    if _leaderboard is None or limit > LEADERBOARD_SIZE:
+        return None
+    return _leaderboard[:limit]
+
+
+def get_tournament_ratings(limit: int = 10) -> list[tuple]:
+    """Return top players as (rank, name, score) tuples."""
+    global _leaderboard
+    cached = cached_ratings(limit)
+    if cached is not None:
+        return cached
+    rows = _query_ratings(max(limit, LEADERBOARD_SIZE))
+    results = [(idx, name, score) for idx, (_, name, score) in enumerate(rows, 1)]
+    if limit <= LEADERBOARD_SIZE:
+        _leaderboard_names.clear()
+        _leaderboard_names.update((user_id, name) for user_id, name, _ in rows)
+        _leaderboard = results
+    return results[:limit]
+
+
+TOURNAMENT_INFO_DB_PATH = Path(__file__).resolve().parent.parent / "tournaments_info.db"
+
+
+TOURNAMENT_INFO_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS tournaments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game TEXT,
+        level TEXT,
+        type TEXT,
+        date TEXT,
+        prize TEXT,
+        preview TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS participants (
+        tournament_id INTEGER,
+        user_id INTEGER,
+        nickname TEXT,
+        age INTEGER,
+        PRIMARY KEY (tournament_id, user_id)
+    )
+    """,
+    # columns missing in databases of older versions
+    add_column("participants", "nickname", "TEXT"),
+    add_column("participants", "age", "INTEGER"),
+    add_column("tournaments", "level", "TEXT"),
+    add_column("tournaments", "prize", "TEXT"),
+    add_column("tournaments", "preview", "TEXT"),
+]
+
+
+def init_tournament_info_db() -> None:
+    """Create table for tournament info."""
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
+        migrate(conn, "tournaments_info", TOURNAMENT_INFO_MIGRATIONS)
 
 
 def add_tournament(game: str, level: str, type_: str, date: str, prize: str, preview: str | None) -> None:
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         conn.execute(
             "INSERT INTO tournaments(game, level, type, date, prize, preview) VALUES(?,?,?,?,?,?)",
             (game, level, type_, date, prize, preview),
         )
-        conn.commit()
 
 
 def get_tournaments() -> list[tuple]:
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         cur = conn.execute(
             "SELECT id, game, level, type, date, prize, preview FROM tournaments ORDER BY id DESC"
         )
@@ -235,7 +475,7 @@ def get_tournaments() -> list[tuple]:
 
 def get_tournament(tid: int) -> tuple | None:
     """Return tournament information by id."""
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         cur = conn.execute(
             "SELECT id, game, level, type, date, prize, preview FROM tournaments WHERE id=?",
             (tid,),
@@ -247,7 +487,7 @@ def update_tournament(
     tid: int, game: str, level: str, type_: str, date: str, prize: str, preview: str | None
 ) -> None:
     """Update tournament information by id."""
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         conn.execute(
             """
             UPDATE tournaments
@@ -256,19 +496,17 @@ def update_tournament(
             """,
             (game, level, type_, date, prize, preview, tid),
         )
-        conn.commit()
 
 
 def delete_tournament(tid: int) -> None:
     """Remove tournament from the database."""
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         conn.execute("DELETE FROM tournaments WHERE id=?", (tid,))
-        conn.commit()
 
 
 def add_participant(tid: int, user_id: int, nickname: str, age: int) -> bool:
     """Add user as participant to the tournament. Return True if added."""
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         try:
             conn.execute(
                 """
@@ -277,7 +515,6 @@ def add_participant(tid: int, user_id: int, nickname: str, age: int) -> bool:
                 """,
                 (tid, user_id, nickname, age),
             )
-            conn.commit()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -285,7 +522,7 @@ def add_participant(tid: int, user_id: int, nickname: str, age: int) -> bool:
 
 def get_participants(tid: int) -> list[tuple[int, str, int]]:
     """Return list of participants with their nicknames and age."""
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         cur = conn.execute(
             "SELECT user_id, nickname, age FROM participants WHERE tournament_id=?",
             (tid,),
@@ -295,9 +532,8 @@ def get_participants(tid: int) -> list[tuple[int, str, int]]:
 
 def remove_participant(tid: int, user_id: int) -> None:
     """Delete participant from tournament."""
-    with sqlite3.connect(TOURNAMENT_INFO_DB_PATH) as conn:
+    with connect(TOURNAMENT_INFO_DB_PATH) as conn:
         conn.execute(
             "DELETE FROM participants WHERE tournament_id=? AND user_id=?",
             (tid, user_id),
         )
-        conn.commit()
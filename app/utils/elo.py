@@ -0,0 +1,151 @@
+"""Elo ratings from individual tournament matches.
+
+Every match is stored in the ``matches`` table and at once updates the
+ratings of both players in two pools: the game as a whole (level
+``ALL_LEVELS``) and the game at the level of the tournament. These pools
+are the per-game and per-level leaderboards.
+
+``recompute_ratings`` replays the whole match history, e.g. after changing
+``K_FACTOR``, reading every level once in match order from its index.
+"""
+import itertools
+import time
+from typing import Iterable
+
+from . import database
+from .connection import connect
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+ALL_LEVELS = ""
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    """Chance of a player rated ``rating`` to beat one rated ``opponent``."""
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+def _rating_change(winner: float, loser: float, draw: bool) -> float:
+    # the loser loses exactly what the winner gains
+    return K_FACTOR * ((0.5 if draw else 1.0) - expected_score(winner, loser))
+
+
+def record_match(
+    game: str,
+    level: str,
+    winner_id: int,
+    loser_id: int,
+    draw: bool = False,
+    tournament_id: int | None = None,
+) -> tuple[float, float]:
+    """Store a match and return the new game ratings of winner and loser."""
+    if winner_id == loser_id:
+        raise ValueError("A player cannot play against themselves")
+    with connect(database.TOURNAMENT_DB_PATH) as conn:
+        conn.execute(
+            """
+            INSERT INTO matches(tournament_id, game, level, winner_id, loser_id, draw, played)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            (tournament_id, game, level, winner_id, loser_id, int(draw), int(time.time())),
+        )
+        for pool_level in dict.fromkeys((level, ALL_LEVELS)):
+            ratings = dict(
+                conn.execute(
+                    """
+                    SELECT user_id, rating FROM elo_ratings
+                    WHERE game=? AND level=? AND user_id IN (?, ?)
+                    """,
+                    (game, pool_level, winner_id, loser_id),
+                ).fetchall()
+            )
+            winner = ratings.get(winner_id, INITIAL_RATING)
+            loser = ratings.get(loser_id, INITIAL_RATING)
+            change = _rating_change(winner, loser, draw)
+            winner, loser = winner + change, loser - change
+            conn.executemany(
+                """
+                INSERT INTO elo_ratings(game, level, user_id, rating, matches) VALUES(?, ?, ?, ?, 1)
+                ON CONFLICT(game, level, user_id) DO UPDATE SET
+                    rating=excluded.rating,
+                    matches=matches + 1
+                """,
+                ((game, pool_level, winner_id, winner), (game, pool_level, loser_id, loser)),
+            )
+    return winner, loser
+
+
+def _replay_python(matches: Iterable[tuple[int, int, int, int]]) -> dict[int, tuple[float, int]]:
+    index: dict[int, int] = {}
+    ratings: list[float] = []
+    played: list[int] = []
+    for _, winner_id, loser_id, draw in matches:
+        winner = index.get(winner_id)
+        if winner is None:
+            winner = index[winner_id] = len(ratings)
+            ratings.append(INITIAL_RATING)
+            played.append(0)
+        loser = index.get(loser_id)
+        if loser is None:
+            loser = index[loser_id] = len(ratings)
+            ratings.append(INITIAL_RATING)
+            played.append(0)
+        rw, rl = ratings[winner], ratings[loser]
+        change = K_FACTOR * ((0.5 if draw else 1.0) - 1 / (1 + 10 ** ((rl - rw) / 400)))
+        ratings[winner] = rw + change
+        ratings[loser] = rl - change
+        played[winner] += 1
+        played[loser] += 1
+    return {user_id: (ratings[i], played[i]) for user_id, i in index.items()}
+
+
+def _replay_game(levels: dict[str, list[tuple]]) -> dict[str, dict]:
+    # every match is read once, as part of its level; the game pool is the
+    # merge of all levels in match order
+    results = {level: _replay_python(rows) for level, rows in levels.items() if level != ALL_LEVELS}
+    # ids are unique, so sorting the concatenated levels merges them by id
+    results[ALL_LEVELS] = _replay_python(sorted(itertools.chain.from_iterable(levels.values())))
+    return results
+
+
+def recompute_ratings() -> int:
+    """Rebuild all Elo ratings from the match history; returns replayed matches."""
+    count = 0
+    with connect(database.TOURNAMENT_DB_PATH) as conn:
+        games: dict[str, dict[str, list[tuple]]] = {}
+        for game, level in conn.execute("SELECT DISTINCT game, level FROM matches").fetchall():
+            rows = conn.execute(
+                """
+                SELECT id, winner_id, loser_id, draw FROM matches
+                WHERE game=? AND level=? ORDER BY id
+                """,
+                (game, level),
+            ).fetchall()
+            games.setdefault(game, {})[level] = rows
+            count += len(rows)
+        conn.execute("DELETE FROM elo_ratings")
+        for game, levels in games.items():
+            for level, ratings in _replay_game(levels).items():
+                conn.executemany(
+                    "INSERT INTO elo_ratings(game, level, user_id, rating, matches) VALUES(?, ?, ?, ?, ?)",
+                    (
+                        (game, level, user_id, rating, played)
+                        for user_id, (rating, played) in sorted(ratings.items())
+                    ),
+                )
+    return count
+
+
+def get_elo_leaderboard(game: str, level: str = ALL_LEVELS, limit: int = 10) -> list[tuple]:
+    """Return (rank, name, rating, matches) of the best players of a game or level."""
+    with connect(database.TOURNAMENT_DB_PATH) as conn:
+        rows = conn.execute(
+            """
+            SELECT COALESCE(u.name, 'User ' || e.user_id), e.rating, e.matches
+            FROM elo_ratings e LEFT JOIN users u ON u.user_id = e.user_id
+            WHERE e.game=? AND e.level=?
+            ORDER BY e.rating DESC LIMIT ?
+            """,
+            (game, level, limit),
+        ).fetchall()
+    return [(rank, name, round(rating), matches) for rank, (name, rating, matches) in enumerate(rows, 1)]
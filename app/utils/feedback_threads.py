@@ -0,0 +1,107 @@
+"""Routing of moderator replies in the feedback chat back to users.
+
+Every forwarded proposal, question or complaint is stored as a thread
+keyed by its message id in the feedback chat. Recent threads are kept in a
+bounded LRU cache; threads older than the configured age are pruned from
+the database at most once per ``PRUNE_INTERVAL``.
+"""
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from .connection import connect
+from .migrations import Step, migrate
+
+FEEDBACK_DB_PATH = Path(__file__).resolve().parent.parent / "feedback.db"
+
+THREAD_TTL = 90 * 86400  # default age after which replies are no longer routed
+PRUNE_INTERVAL = 3600  # seconds between prunes
+MAX_CACHED = 10_000  # threads kept in memory
+
+# feedback chat message_id -> (user chat id, created), least recently used first
+_cache: OrderedDict[int, tuple[int, int]] = OrderedDict()
+_ttl = THREAD_TTL
+_last_prune = 0.0
+
+
+def set_thread_ttl(seconds: int) -> None:
+    """Change the age after which feedback threads are pruned."""
+    global _ttl
+    _ttl = seconds
+
+
+FEEDBACK_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS feedback_threads(
+        message_id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        kind TEXT,
+        created INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_feedback_threads_created ON feedback_threads(created)",
+]
+
+
+def init_feedback_db() -> None:
+    """Initialize database for feedback threads."""
+    with connect(FEEDBACK_DB_PATH) as conn:
+        migrate(conn, "feedback", FEEDBACK_MIGRATIONS)
+
+
+def _remember(message_id: int, user_id: int, created: int) -> None:
+    _cache[message_id] = (user_id, created)
+    _cache.move_to_end(message_id)
+    if len(_cache) > MAX_CACHED:
+        _cache.popitem(last=False)
+
+
+def add_thread(message_id: int, user_id: int, kind: str) -> None:
+    """Remember that ``message_id`` in the feedback chat came from ``user_id``."""
+    global _last_prune
+    now = int(time.time())
+    with connect(FEEDBACK_DB_PATH) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO feedback_threads(message_id, user_id, kind, created) VALUES(?,?,?,?)",
+            (message_id, user_id, kind, now),
+        )
+        if now - _last_prune >= PRUNE_INTERVAL:
+            conn.execute("DELETE FROM feedback_threads WHERE created < ?", (now - _ttl,))
+            _last_prune = now
+    _remember(message_id, user_id, now)
+
+
+def get_thread_user(message_id: int) -> int | None:
+    """Return chat id of the user who sent feedback message ``message_id``."""
+    cutoff = time.time() - _ttl
+    cached = _cache.get(message_id)
+    if cached is not None:
+        if cached[1] >= cutoff:
+            _cache.move_to_end(message_id)
+            return cached[0]
+        del _cache[message_id]
+        return None
+    with connect(FEEDBACK_DB_PATH) as conn:
+        row = conn.execute(
+            "SELECT user_id, created FROM feedback_threads WHERE message_id=? AND created >= ?",
+            (message_id, cutoff),
+        ).fetchone()
+    if not row:
+        return None
+    _remember(message_id, row[0], row[1])
+    return row[0]
+
+
+def prune_threads() -> int:
+    """Delete threads older than the configured age and return their number."""
+    global _last_prune
+    now = int(time.time())
+    with connect(FEEDBACK_DB_PATH) as conn:
+        deleted = conn.execute(
+            "DELETE FROM feedback_threads WHERE created < ?", (now - _ttl,)
+        ).rowcount
+    _last_prune = now
+    for message_id, (_, created) in list(_cache.items()):
+        if created < now - _ttl:
+            del _cache[message_id]
+    return deleted
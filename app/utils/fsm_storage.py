@@ -0,0 +1,209 @@
+"""SQLite-backed FSM storage for the dispatcher.
+
+Unfinished flows (suggestions, feedback, tournament signup and creation,
+admin edits) survive restarts. In the default mode reads are served from an
+in-process cache and changes are written in one transaction every
+``FLUSH_INTERVAL`` seconds. With ``shared=True`` every read and write goes
+straight to the database so several bot workers can use the same file.
+States untouched for ``STATE_TTL`` seconds are considered abandoned and
+removed.
+"""
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from .connection import connect, run
+
+FSM_DB_PATH = Path(__file__).resolve().parent.parent / "fsm.db"
+
+FLUSH_INTERVAL = 1.0  # seconds between batched writes
+STATE_TTL = 7 * 24 * 3600  # abandoned states are removed after a week
+CACHE_IDLE = 3600  # clean cache entries are dropped after an hour unused
+SWEEP_INTERVAL = 600  # seconds between TTL cleanups
+
+logger = logging.getLogger(__name__)
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            getattr(key, "business_connection_id", None),
+            key.destiny,
+        )
+    )
+
+
+class _Record:
+    __slots__ = ("state", "data", "updated")
+
+    def __init__(self, state: str | None, data: dict, updated: float) -> None:
+        self.state = state
+        self.data = data
+        self.updated = updated
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage keeping states and data in a SQLite (WAL) file."""
+
+    def __init__(
+        self,
+        path: str | Path = FSM_DB_PATH,
+        shared: bool = False,
+        flush_interval: float = FLUSH_INTERVAL,
+        state_ttl: float = STATE_TTL,
+    ) -> None:
+        self.path = path
+        self.shared = shared
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self._cache: dict[str, _Record] = {}
+        self._dirty: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+        with connect(path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fsm_states(
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT,
+                    updated REAL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states(updated)"
+            )
+
+    # database helpers, executed on the worker thread of the file
+
+    def _load(self, key: str) -> _Record | None:
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT state, data, updated FROM fsm_states WHERE key=?",
+                (key,),
+            ).fetchone()
+        if not row:
+            return None
+        return _Record(row[0], json.loads(row[1] or "{}"), row[2])
+
+    def _write(self, rows: list[tuple[str, str | None, dict, float]]) -> None:
+        with connect(self.path) as conn:
+            for key, state, data, updated in rows:
+                if state is None and not data:
+                    conn.execute("DELETE FROM fsm_states WHERE key=?", (key,))
+                else:
+                    conn.execute(
+                        """
+                        INSERT INTO fsm_states(key, state, data, updated)
+                        VALUES(?, ?, ?, ?)
+                        ON CONFLICT(key) DO UPDATE SET
+                            state=excluded.state,
+                            data=excluded.data,
+                            updated=excluded.updated
+                        """,
+                        (key, state, json.dumps(data, ensure_ascii=False), updated),
+                    )
+
+    def _purge(self, before: float) -> int:
+        with connect(self.path) as conn:
+            return conn.execute(
+                "DELETE FROM fsm_states WHERE updated < ?", (before,)
+            ).rowcount
+
+    # cache and background work
+
+    def _start(self) -> None:
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        if not self.shared:
+            self._tasks.append(loop.create_task(self._flush_loop()))
+        self._tasks.append(loop.create_task(self._sweep_loop()))
+
+    async def _record(self, key: str) -> _Record:
+        self._start()
+        record = None if self.shared else self._cache.get(key)
+        if record is None:
+            record = await run(self.path, self._load, key) or _Record(None, {}, time.time())
+            if not self.shared:
+                # a concurrent call may have filled the cache meanwhile
+                record = self._cache.setdefault(key, record)
+        return record
+
+    async def _store(self, key: str, record: _Record) -> None:
+        record.updated = time.time()
+        if self.shared:
+            await run(self.path, self._write, [(key, record.state, record.data, record.updated)])
+        else:
+            self._dirty.add(key)
+
+    async def flush(self) -> None:
+        """Write all pending changes in one transaction."""
+        if not self._dirty:
+            return
+        keys, self._dirty = self._dirty, set()
+        rows = []
+        for key in keys:
+            record = self._cache[key]
+            rows.append((key, record.state, dict(record.data), record.updated))
+        try:
+            await run(self.path, self._write, rows)
+        except Exception:
+            logger.exception("Failed to flush %d FSM states", len(rows))
+            self._dirty |= keys
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            now = time.time()
+            removed = await run(self.path, self._purge, now - self.state_ttl)
+            for key, record in list(self._cache.items()):
+                if key in self._dirty:
+                    continue
+                if record.updated < now - min(CACHE_IDLE, self.state_ttl):
+                    del self._cache[key]
+            if removed:
+                logger.info("Removed %d abandoned FSM states", removed)
+
+    # BaseStorage interface
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        skey = _key(key)
+        record = await self._record(skey)
+        record.state = state.state if isinstance(state, State) else state
+        await self._store(skey, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._record(_key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        skey = _key(key)
+        record = await self._record(skey)
+        record.data = dict(data)
+        await self._store(skey, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict((await self._record(_key(key))).data)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
@@ -1,29 +1,275 @@
-from collections import defaultdict
+"""Private chat messages to delete on the user's next menu action.
+
+Each chat keeps at most ``MAX_PER_CHAT`` message ids in a compact array,
+oldest dropped first, and at most ``MAX_TRACKED_CHATS`` chats are tracked.
+Telegram does not let bots delete messages older than 48 hours, so chats
+idle for longer are forgotten by the sweeper. When persistence is enabled
+the sweeper also writes changed chats to SQLite, so menus sent before a
+restart are still cleaned up. ``cleanup`` deletes up to 100 messages per
+deleteMessages call, in the background by default.
+"""
+import asyncio
+import logging
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
 from aiogram import Bot, types
 from aiogram.enums import ChatType
 
-_message_history: dict[int, list[int]] = defaultdict(list)
+from .connection import connect, run
+
+HISTORY_DB_PATH = Path(__file__).resolve().parent.parent / "history.db"
+
+MAX_PER_CHAT = 50  # ids kept per chat, older ones are dropped
+MAX_TRACKED_CHATS = 50_000  # least recently active chats go first
+CHAT_IDLE = 48 * 3600  # messages older than this cannot be deleted anyway
+SWEEP_INTERVAL = 60.0  # seconds between sweeps and persistence flushes
+DELETE_BATCH = 100  # deleteMessages accepts at most 100 ids
+DELETE_CONCURRENCY = 5  # single deletes in flight when the bulk call fails
+CLEANUP_IN_BACKGROUND = True
+
+logger = logging.getLogger(__name__)
+
+
+class _ChatHistory:
+    __slots__ = ("ids", "last")
+
+    def __init__(self) -> None:
+        self.ids = array("q")
+        self.last = 0.0
+
+
+# chat_id -> history, ordered from least to most recently active
+_message_history: OrderedDict[int, _ChatHistory] = OrderedDict()
+_dirty: set[int] = set()
+_db_path: Path | None = None
+_sweeper: asyncio.Task | None = None
+_cleanup_tasks: set[asyncio.Task] = set()
+
+history_stats = {
+    "dropped_ids": 0,
+    "evicted_chats": 0,
+    "expired_chats": 0,
+    "flushes": 0,
+}
+
+# delete_time is spent on deletions, handler_wait is the part handlers waited for
+cleanup_stats = {
+    "cleanups": 0,
+    "ids": 0,
+    "batch_requests": 0,
+    "single_requests": 0,
+    "fallbacks": 0,
+    "delete_time": 0.0,
+    "handler_wait": 0.0,
+}
+
+
+def _remember(chat_id: int, message_id: int) -> None:
+    history = _message_history.get(chat_id)
+    if history is None:
+        history = _message_history[chat_id] = _ChatHistory()
+        if len(_message_history) > MAX_TRACKED_CHATS:
+            evicted, _ = _message_history.popitem(last=False)
+            _dirty.add(evicted)
+            history_stats["evicted_chats"] += 1
+    else:
+        _message_history.move_to_end(chat_id)
+    ids = history.ids
+    if len(ids) >= MAX_PER_CHAT:
+        del ids[0]
+        history_stats["dropped_ids"] += 1
+    ids.append(message_id)
+    history.last = time.time()
+    _dirty.add(chat_id)
 
 
 def record_message(message: types.Message) -> None:
     """Remember a message to remove later."""
     if message.chat.type != ChatType.PRIVATE:
         return
-    _message_history[message.chat.id].append(message.message_id)
+    _remember(message.chat.id, message.message_id)
 
 
 def record_sent(message: types.Message) -> None:
     """Remember a bot reply to remove later."""
     if message.chat.type != ChatType.PRIVATE:
         return
-    _message_history[message.chat.id].append(message.message_id)
+    _remember(message.chat.id, message.message_id)
 
 
-async def cleanup(bot: Bot, chat_id: int) -> None:
-    """Delete stored messages for chat."""
-    ids = _message_history.pop(chat_id, [])
-    for mid in ids:
+async def _delete_one(bot: Bot, chat_id: int, message_id: int, limit: asyncio.Semaphore) -> None:
+    async with limit:
+        cleanup_stats["single_requests"] += 1
         try:
-            await bot.delete_message(chat_id, mid)
+            await bot.delete_message(chat_id, message_id)
         except Exception:
+            # already deleted by the user or too old
+            pass
+
+
+async def _delete(bot: Bot, chat_id: int, ids: list[int]) -> None:
+    start = time.perf_counter()
+    for i in range(0, len(ids), DELETE_BATCH):
+        batch = ids[i:i + DELETE_BATCH]
+        cleanup_stats["batch_requests"] += 1
+        try:
+            await bot.delete_messages(chat_id, batch)
+            continue
+        except Exception as exc:
+            logger.debug("deleteMessages failed in chat %s: %s", chat_id, exc)
+            cleanup_stats["fallbacks"] += 1
+        limit = asyncio.Semaphore(DELETE_CONCURRENCY)
+        await asyncio.gather(*(_delete_one(bot, chat_id, mid, limit) for mid in batch))
+    cleanup_stats["delete_time"] += time.perf_counter() - start
+
+
+async def cleanup(bot: Bot, chat_id: int, wait: bool | None = None) -> None:
+    """Delete stored messages for chat.
+
+    Unless ``wait`` is true (default: ``not CLEANUP_IN_BACKGROUND``),
+    deletion runs in a background task and the handler continues with its
+    reply right away.
+    """
+    history = _message_history.pop(chat_id, None)
+    if history is None:
+        return
+    _dirty.add(chat_id)
+    ids = history.ids.tolist()
+    cleanup_stats["cleanups"] += 1
+    cleanup_stats["ids"] += len(ids)
+    if wait is None:
+        wait = not CLEANUP_IN_BACKGROUND
+    if wait:
+        start = time.perf_counter()
+        await _delete(bot, chat_id, ids)
+        cleanup_stats["handler_wait"] += time.perf_counter() - start
+        return
+    task = asyncio.get_running_loop().create_task(_delete(bot, chat_id, ids))
+    _cleanup_tasks.add(task)
+    task.add_done_callback(_cleanup_tasks.discard)
+
+
+def get_history_stats() -> dict:
+    """Return tracked chats and ids, eviction counters and cleanup metrics."""
+    requests = cleanup_stats["batch_requests"] + cleanup_stats["single_requests"]
+    return {
+        "tracked_chats": len(_message_history),
+        "tracked_ids": sum(len(h.ids) for h in _message_history.values()),
+        "dirty_chats": len(_dirty),
+        **history_stats,
+        **cleanup_stats,
+        # compared with one deleteMessage call per id, awaited by the handler
+        "saved_requests": cleanup_stats["ids"] - requests,
+        "saved_wait": cleanup_stats["delete_time"] - cleanup_stats["handler_wait"],
+    }
+
+
+def sweep(now: float | None = None) -> int:
+    """Forget chats idle for longer than ``CHAT_IDLE`` and return their number."""
+    cutoff = (now or time.time()) - CHAT_IDLE
+    expired = 0
+    while _message_history:
+        chat_id, history = next(iter(_message_history.items()))
+        if history.last >= cutoff:
+            break
+        del _message_history[chat_id]
+        _dirty.add(chat_id)
+        expired += 1
+    history_stats["expired_chats"] += expired
+    return expired
+
+
+# persistence
+
+def init_history_db(path: str | Path = HISTORY_DB_PATH) -> None:
+    """Enable persistence in ``path`` and load recent history from it."""
+    global _db_path
+    _db_path = Path(path)
+    cutoff = time.time() - CHAT_IDLE
+    with connect(_db_path) as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS message_history(
+                chat_id INTEGER PRIMARY KEY,
+                ids BLOB,
+                last REAL
+            )
+            """
+        )
+        conn.execute("DELETE FROM message_history WHERE last < ?", (cutoff,))
+        rows = conn.execute(
+            "SELECT chat_id, ids, last FROM message_history ORDER BY last DESC LIMIT ?",
+            (MAX_TRACKED_CHATS,),
+        ).fetchall()
+    for chat_id, ids, last in reversed(rows):
+        history = _ChatHistory()
+        history.ids.frombytes(ids)
+        history.last = last
+        _message_history[chat_id] = history
+
+
+def _write(rows: list[tuple[int, bytes | None, float]]) -> None:
+    with connect(_db_path) as conn:
+        for chat_id, ids, last in rows:
+            if ids is None:
+                conn.execute("DELETE FROM message_history WHERE chat_id=?", (chat_id,))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO message_history(chat_id, ids, last) VALUES(?,?,?)",
+                    (chat_id, ids, last),
+                )
+
+
+async def flush() -> None:
+    """Write chats changed since the last flush, if persistence is enabled."""
+    global _dirty
+    if _db_path is None or not _dirty:
+        _dirty.clear()
+        return
+    chats, _dirty = _dirty, set()
+    rows = []
+    for chat_id in chats:
+        history = _message_history.get(chat_id)
+        if history is None or not history.ids:
+            rows.append((chat_id, None, 0.0))
+        else:
+            rows.append((chat_id, history.ids.tobytes(), history.last))
+    try:
+        await run(_db_path, _write, rows)
+    except Exception:
+        logger.exception("Failed to persist history of %d chats", len(rows))
+        _dirty |= chats
+        return
+    history_stats["flushes"] += 1
+
+
+async def _run_sweeper() -> None:
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        sweep()
+        await flush()
+
+
+def start_sweeper() -> None:
+    """Start periodic eviction and persistence in the running event loop."""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = asyncio.get_running_loop().create_task(_run_sweeper())
+
+
+async def stop_sweeper() -> None:
+    """Stop the sweeper, finish running cleanups and persist pending changes."""
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        try:
+            await _sweeper
+        except asyncio.CancelledError:
             pass
+        _sweeper = None
+    if _cleanup_tasks:
+        await asyncio.gather(*_cleanup_tasks, return_exceptions=True)
+    await flush()
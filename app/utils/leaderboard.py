@@ -0,0 +1,215 @@
+"""Tournament leaderboard kept in memory for rank queries.
+
+Players are ordered by score, highest first and ties by user id, in an
+indexable skip list. The rank of any player and the players around them
+are found in O(log n) instead of counting over the ratings table; the top
+players are read through the score index by ``get_tournament_ratings``.
+``load_leaderboard`` fills the list from the ratings table at startup and
+score writers call ``set_score`` once their transaction has committed.
+The structure is only changed and read on the tournaments worker thread,
+so handlers use the mirrors in ``aio``.
+"""
+import math
+import random
+from typing import Iterable, Iterator
+
+from . import database
+from .connection import connect
+
+MAX_LEVELS = 24  # enough for millions of players
+
+_END = (math.inf,)  # sorts after every (-score, user_id) key
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: tuple, levels: int) -> None:
+        self.key = key
+        self.next: list[_Node | None] = [None] * levels
+        # number of positions skipped by following next[level]
+        self.width = [1] * levels
+
+
+def _random_levels() -> int:
+    # 1 + number of trailing zero bits: level k is reached with chance 2**-k
+    bits = random.getrandbits(MAX_LEVELS - 1)
+    return (bits & -bits).bit_length() or MAX_LEVELS
+
+
+class RankedList:
+    """Sorted keys with O(log n) insert, remove, rank and access by position."""
+
+    def __init__(self, keys: Iterable[tuple] = ()) -> None:
+        self._tail = _Node(_END, 0)
+        self._head = _Node(None, MAX_LEVELS)
+        self._head.next = [self._tail] * MAX_LEVELS
+        self._size = 0
+        self._extend_sorted(keys)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _extend_sorted(self, keys: Iterable[tuple]) -> None:
+        # builds the list in O(n) from keys that are already in order
+        last = [self._head] * MAX_LEVELS
+        last_pos = [-1] * MAX_LEVELS
+        pos = -1
+        for pos, key in enumerate(keys):
+            node = _Node(key, _random_levels())
+            for level in range(len(node.next)):
+                prev = last[level]
+                prev.next[level] = node
+                prev.width[level] = pos - last_pos[level]
+                last[level] = node
+                last_pos[level] = pos
+        self._size = pos + 1
+        for level in range(MAX_LEVELS):
+            last[level].next[level] = self._tail
+            last[level].width[level] = self._size - last_pos[level]
+
+    def _chain(self, key: tuple) -> tuple[list[_Node], list[int]]:
+        # the last node before ``key`` on each level and its position
+        chain = [self._head] * MAX_LEVELS
+        positions = [-1] * MAX_LEVELS
+        node, pos = self._head, -1
+        for level in range(MAX_LEVELS - 1, -1, -1):
+            while node.next[level].key < key:
+                pos += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = pos
+        return chain, positions
+
+    def add(self, key: tuple) -> None:
+        chain, positions = self._chain(key)
+        node = _Node(key, _random_levels())
+        pos = positions[0] + 1
+        for level in range(len(node.next)):
+            prev = chain[level]
+            skipped = pos - positions[level]
+            node.next[level] = prev.next[level]
+            node.width[level] = prev.width[level] - skipped + 1
+            prev.next[level] = node
+            prev.width[level] = skipped
+        for level in range(len(node.next), MAX_LEVELS):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key: tuple) -> None:
+        chain, _ = self._chain(key)
+        node = chain[0].next[0]
+        if node.key != key:
+            raise KeyError(key)
+        for level in range(len(node.next)):
+            prev = chain[level]
+            prev.width[level] += node.width[level] - 1
+            prev.next[level] = node.next[level]
+        for level in range(len(node.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def index(self, key: tuple) -> int:
+        """Return the 0-based position of ``key``."""
+        chain, positions = self._chain(key)
+        if chain[0].next[0].key != key:
+            raise KeyError(key)
+        return positions[0] + 1
+
+    def _node_at(self, index: int) -> _Node:
+        node, pos = self._head, -1
+        for level in range(MAX_LEVELS - 1, -1, -1):
+            while pos + node.width[level] <= index:
+                pos += node.width[level]
+                node = node.next[level]
+        return node
+
+    def iter_from(self, start: int) -> Iterator[tuple]:
+        """Yield keys starting at position ``start``."""
+        if start >= self._size:
+            return
+        node = self._node_at(max(start, 0))
+        while node is not self._tail:
+            yield node.key
+            node = node.next[0]
+
+
+_board = RankedList()
+# user_id -> score of every player on the board
+_scores: dict[int, int] = {}
+
+
+def load_leaderboard() -> int:
+    """Fill the leaderboard from the ratings table and return the player count."""
+    global _board
+    with connect(database.TOURNAMENT_DB_PATH) as conn:
+        rows = conn.execute(
+            "SELECT user_id, score FROM ratings ORDER BY score DESC, user_id"
+        ).fetchall()
+    _scores.clear()
+    _scores.update(rows)
+    _board = RankedList((-score, user_id) for user_id, score in rows)
+    return len(rows)
+
+
+def _top_position(position: int) -> bool:
+    return position < database.LEADERBOARD_SIZE
+
+
+def set_score(user_id: int, score: int) -> None:
+    """Move a player to the position of their new score."""
+    old = _scores.get(user_id)
+    if old == score:
+        return
+    changed_top = False
+    if old is not None:
+        key = (-old, user_id)
+        changed_top = _top_position(_board.index(key))
+        _board.remove(key)
+    key = (-score, user_id)
+    _board.add(key)
+    _scores[user_id] = score
+    if changed_top or _top_position(_board.index(key)):
+        database.invalidate_leaderboard()
+
+
+def player_count() -> int:
+    """Return the number of ranked players; safe to call from the event loop."""
+    return len(_board)
+
+
+def get_player_rank(user_id: int) -> tuple[int, int] | None:
+    """Return (rank, score) of a player, ranks start at 1."""
+    score = _scores.get(user_id)
+    if score is None:
+        return None
+    return _board.index((-score, user_id)) + 1, score
+
+
+def _with_names(start: int, keys: list[tuple]) -> list[tuple]:
+    ids = [user_id for _, user_id in keys]
+    placeholders = ",".join("?" * len(ids))
+    with connect(database.TOURNAMENT_DB_PATH) as conn:
+        names = dict(
+            conn.execute(
+                f"SELECT user_id, name FROM users WHERE user_id IN ({placeholders})", ids
+            ).fetchall()
+        )
+    return [
+        (start + idx + 1, names.get(user_id) or f"User {user_id}", -neg_score)
+        for idx, (neg_score, user_id) in enumerate(keys)
+    ]
+
+
+def get_players_around(user_id: int, radius: int = 2) -> list[tuple]:
+    """Return (rank, name, score) of a player and up to ``radius`` neighbours each side."""
+    score = _scores.get(user_id)
+    if score is None:
+        return []
+    start = max(_board.index((-score, user_id)) - radius, 0)
+    keys = []
+    for key in _board.iter_from(start):
+        if len(keys) > 2 * radius:
+            break
+        keys.append(key)
+    return _with_names(start, keys)
@@ -0,0 +1,163 @@
+"""Storage backends for the per-user spam limiter state.
+
+``MemoryLimiterBackend`` keeps state in process memory. ``SQLiteLimiterBackend``
+keeps it in a shared SQLite (WAL) file, so daily quotas and flood windows
+survive restarts and are shared by every bot worker using the same file.
+"""
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+import zlib
+
+from .connection import connect
+
+# Upper bound on users tracked in memory; least recently active go first
+MAX_TRACKED_USERS = 100_000
+
+DEFAULT_LIMITER_DB_PATH = Path(__file__).resolve().parent.parent / "limiter.db"
+
+
+def text_hash(text: str) -> int:
+    """Stable across processes, unlike the built-in ``hash``."""
+    return zlib.crc32(text.encode())
+
+
+class UserState:
+    """Per-user limiter state with a fixed-size ring of message times."""
+
+    __slots__ = ("day", "count", "last_time", "last_text_hash", "times", "pos")
+
+    def __init__(self, day: int, ring_size: int) -> None:
+        self.day = day
+        self.count = 0
+        self.last_time = 0.0
+        self.last_text_hash: int | None = None
+        # -inf slots never fall inside the flood window
+        self.times = array("d", [float("-inf")] * ring_size)
+        self.pos = 0
+
+    def push_time(self, now: float) -> float:
+        """Store message time and return the oldest time in the ring."""
+        times = self.times
+        times[self.pos] = now
+        self.pos = (self.pos + 1) % len(times)
+        return times[self.pos]
+
+
+class LimiterBackend:
+    """Where ``spam.check_message_allowed`` keeps per-user state."""
+
+    def state(self, user_id: int, day: int) -> Iterator[UserState]:
+        """Context manager yielding user's state for ``day``.
+
+        A state from another day is replaced with a fresh one. Changes made
+        inside the block are stored when it exits, atomically with the read.
+        """
+        raise NotImplementedError
+
+
+class MemoryLimiterBackend(LimiterBackend):
+    """Process-local state, lost on restart."""
+
+    def __init__(self, ring_size: int, max_users: int = MAX_TRACKED_USERS) -> None:
+        self.ring_size = ring_size
+        self.max_users = max_users
+        # user_id -> state, ordered from least to most recently active
+        self.states: OrderedDict[int, UserState] = OrderedDict()
+
+    @contextmanager
+    def state(self, user_id: int, day: int) -> Iterator[UserState]:
+        states = self.states
+        data = states.get(user_id)
+        if data is None or data.day != day:
+            data = UserState(day, self.ring_size)
+            states[user_id] = data
+        states.move_to_end(user_id)
+        # states from previous days would be reset anyway, drop them eagerly
+        while states:
+            oldest = next(iter(states.values()))
+            if oldest.day == day and len(states) <= self.max_users:
+                break
+            states.popitem(last=False)
+        yield data
+
+
+class SQLiteLimiterBackend(LimiterBackend):
+    """State shared through a SQLite file.
+
+    Each check runs in a ``BEGIN IMMEDIATE`` transaction, so concurrent
+    workers cannot both spend the same quota. Rows from previous days
+    expire and are deleted once per day.
+    """
+
+    def __init__(self, path: str | Path, ring_size: int) -> None:
+        self.path = path
+        self.ring_size = ring_size
+        self._purged_day = -1
+        with connect(path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS limiter_state(
+                    user_id INTEGER PRIMARY KEY,
+                    day INTEGER,
+                    count INTEGER,
+                    last_time REAL,
+                    last_text_hash INTEGER,
+                    times BLOB,
+                    pos INTEGER
+                )
+                """
+            )
+
+    @contextmanager
+    def state(self, user_id: int, day: int) -> Iterator[UserState]:
+        with connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if day != self._purged_day:
+                conn.execute("DELETE FROM limiter_state WHERE day < ?", (day,))
+                self._purged_day = day
+            row = conn.execute(
+                """
+                SELECT count, last_time, last_text_hash, times, pos
+                FROM limiter_state WHERE user_id=? AND day=?
+                """,
+                (user_id, day),
+            ).fetchone()
+            data = UserState(day, self.ring_size)
+            if row and len(row[3]) == len(data.times) * data.times.itemsize:
+                data.count, data.last_time, data.last_text_hash, times, data.pos = row
+                data.times = array("d", times)
+            yield data
+            conn.execute(
+                """
+                INSERT INTO limiter_state(user_id, day, count, last_time, last_text_hash, times, pos)
+                VALUES(?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    day=excluded.day,
+                    count=excluded.count,
+                    last_time=excluded.last_time,
+                    last_text_hash=excluded.last_text_hash,
+                    times=excluded.times,
+                    pos=excluded.pos
+                """,
+                (
+                    user_id,
+                    data.day,
+                    data.count,
+                    data.last_time,
+                    data.last_text_hash,
+                    data.times.tobytes(),
+                    data.pos,
+                ),
+            )
+
+
+def create_backend(kind: str, ring_size: int, path: str | Path | None = None) -> LimiterBackend:
+    """Build a backend by name: "memory" or "sqlite"."""
+    if kind == "memory":
+        return MemoryLimiterBackend(ring_size)
+    if kind == "sqlite":
+        return SQLiteLimiterBackend(path or DEFAULT_LIMITER_DB_PATH, ring_size)
+    raise ValueError(f"Unknown limiter backend: {kind}")
@@ -0,0 +1,77 @@
+"""Versioned schema migrations.
+
+Each component (users, tournaments, moderation, ...) describes its schema as
+an append-only list of steps. A step is one SQL statement or a function
+taking the connection. ``migrate`` keeps the number of applied steps per
+component in the ``schema_versions`` table of the database file and runs
+only the steps added since, in one transaction. Steps must also work on
+databases created before versioning existed, which is why columns are added
+with ``add_column`` rather than a bare ALTER TABLE.
+"""
+import sqlite3
+import time
+from typing import Callable, Sequence
+
+Step = str | Callable[[sqlite3.Connection], None]
+
+
+def add_column(table: str, column: str, decl: str) -> Callable[[sqlite3.Connection], None]:
+    """Step adding ``column`` to ``table`` unless it is already there."""
+
+    def step(conn: sqlite3.Connection) -> None:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    step.__name__ = f"add_column_{table}_{column}"
+    return step
+
+
+def _ensure_versions_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_versions(
+            component TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated INTEGER
+        )
+        """
+    )
+
+
+def get_version(conn: sqlite3.Connection, component: str) -> int:
+    """Return the number of applied steps of ``component`` (0 if unknown)."""
+    _ensure_versions_table(conn)
+    row = conn.execute(
+        "SELECT version FROM schema_versions WHERE component=?", (component,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def migrate(conn: sqlite3.Connection, component: str, steps: Sequence[Step]) -> int:
+    """Apply pending steps of ``component`` and return how many were applied."""
+    if not conn.in_transaction:
+        # DDL does not open a transaction implicitly
+        conn.execute("BEGIN")
+    current = get_version(conn, component)
+    if current > len(steps):
+        raise RuntimeError(
+            f"Schema of {component} is at version {current}, "
+            f"this code only knows {len(steps)} steps"
+        )
+    for step in steps[current:]:
+        if isinstance(step, str):
+            conn.execute(step)
+        else:
+            step(conn)
+    if current < len(steps):
+        conn.execute(
+            """
+            INSERT INTO schema_versions(component, version, updated) VALUES(?, ?, ?)
+            ON CONFLICT(component) DO UPDATE SET
+                version=excluded.version,
+                updated=excluded.updated
+            """,
+            (component, len(steps), int(time.time())),
+        )
+    return len(steps) - current
@@ -1,121 +1,220 @@
+import asyncio
 import sqlite3
 import time
 from pathlib import Path
+from .connection import connect, run
+from .migrations import Step, add_column, migrate
 from .modlog import log_action, add_strike
 
 MOD_DB_PATH = Path(__file__).resolve().parent.parent / "moderation.db"
 
+# bumped on every change of banned words/links so cached matchers rebuild
+_banned_version = 0
+
+# in-process mirror of the mutes/bans tables: user_id -> until (0 = forever)
+_mutes: dict[int, int] | None = None
+_bans: dict[int, int] | None = None
+
+# role registry: admins/moderators kept in memory and updated on change;
+# a background task reloads it every ROLE_REFRESH_INTERVAL seconds to pick
+# up external edits
+ROLE_REFRESH_INTERVAL = 300  # 0 disables periodic reloads
+_admins: set[int] | None = None
+_moderators: set[int] | None = None
+_role_refresher: asyncio.Task | None = None
+
+
+def _seed_banned_words(conn: sqlite3.Connection) -> None:
+    cur = conn.execute("SELECT COUNT(*) FROM banned_words")
+    if cur.fetchone()[0] == 0:
+        conn.executemany(
+            "INSERT INTO banned_words(word) VALUES(?)",
+            [
+                ("spam",),
+                ("junk",),
+                ("badword",),
+                ("хуй",),
+                ("пизда",),
+                ("блять",),
+                ("сука",),
+            ],
+        )
+
+
+MODERATION_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS banned_words(
+        word TEXT PRIMARY KEY
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS banned_links(
+        link TEXT PRIMARY KEY
+    )
+    """,
+    _seed_banned_words,
+    """
+    CREATE TABLE IF NOT EXISTS warnings(
+        user_id INTEGER PRIMARY KEY,
+        count INTEGER DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS mutes(
+        user_id INTEGER PRIMARY KEY,
+        until INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bans(
+        user_id INTEGER PRIMARY KEY,
+        until INTEGER DEFAULT 0
+    )
+    """,
+    # column 'until' is missing in older databases
+    add_column("bans", "until", "INTEGER DEFAULT 0"),
+    """
+    CREATE TABLE IF NOT EXISTS admins(
+        user_id INTEGER PRIMARY KEY
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS moderators(
+        user_id INTEGER PRIMARY KEY
+    )
+    """,
+]
+
 
 def init_moderation_db() -> None:
     """Create tables for moderation data."""
-    with sqlite3.connect(MOD_DB_PATH) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS banned_words(
-                word TEXT PRIMARY KEY
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS banned_links(
-                link TEXT PRIMARY KEY
-            )
-            """
-        )
-        cur = conn.execute("SELECT COUNT(*) FROM banned_words")
-        if cur.fetchone()[0] == 0:
-            conn.executemany(
-                "INSERT INTO banned_words(word) VALUES(?)",
-                [
-                    ("spam",),
-                    ("junk",),
-                    ("badword",),
-                    ("хуй",),
-                    ("пизда",),
-                    ("блять",),
-                    ("сука",),
-                ],
-            )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS warnings(
-                user_id INTEGER PRIMARY KEY,
-                count INTEGER DEFAULT 0
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mutes(
-                user_id INTEGER PRIMARY KEY,
-                until INTEGER
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS bans(
-                user_id INTEGER PRIMARY KEY,
-                until INTEGER DEFAULT 0
-            )
-            """
-        )
-        # ensure column 'until' exists for older databases
+    with connect(MOD_DB_PATH) as conn:
+        migrate(conn, "moderation", MODERATION_MIGRATIONS)
+    load_restrictions()
+    load_roles()
+
+
+def load_roles() -> None:
+    """Fill the role registry from the database."""
+    global _admins, _moderators
+    with connect(MOD_DB_PATH) as conn:
+        admins = {row[0] for row in conn.execute("SELECT user_id FROM admins")}
+        moderators = {row[0] for row in conn.execute("SELECT user_id FROM moderators")}
+    _admins, _moderators = admins, moderators
+
+
+def _get_roles() -> tuple[set[int], set[int]]:
+    if _admins is None:
+        load_roles()
+    return _admins, _moderators
+
+
+async def _run_role_refresher() -> None:
+    while True:
+        await asyncio.sleep(ROLE_REFRESH_INTERVAL)
+        await run(MOD_DB_PATH, load_roles)
+
+
+def start_role_refresher() -> None:
+    """Start periodic reloads of the role registry in the running event loop."""
+    global _role_refresher
+    if _role_refresher is None and ROLE_REFRESH_INTERVAL:
+        _role_refresher = asyncio.get_running_loop().create_task(_run_role_refresher())
+
+
+async def stop_role_refresher() -> None:
+    global _role_refresher
+    if _role_refresher is not None:
+        _role_refresher.cancel()
         try:
-            conn.execute("ALTER TABLE bans ADD COLUMN until INTEGER DEFAULT 0")
-        except sqlite3.OperationalError:
+            await _role_refresher
+        except asyncio.CancelledError:
             pass
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS admins(
-                user_id INTEGER PRIMARY KEY
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS moderators(
-                user_id INTEGER PRIMARY KEY
-            )
-            """
-        )
-        conn.commit()
+        _role_refresher = None
+
+
+def is_admin(user_id: int) -> bool:
+    """Return True if user was promoted to admin."""
+    return user_id in _get_roles()[0]
+
+
+def is_moderator(user_id: int) -> bool:
+    """Return True if user was promoted to moderator."""
+    return user_id in _get_roles()[1]
+
+
+def load_restrictions() -> None:
+    """Fill the mute/ban cache from the database."""
+    global _mutes, _bans
+    with connect(MOD_DB_PATH) as conn:
+        mutes = dict(conn.execute("SELECT user_id, until FROM mutes").fetchall())
+        bans = dict(conn.execute("SELECT user_id, until FROM bans").fetchall())
+    _mutes, _bans = mutes, bans
+
+
+def _get_mutes() -> dict[int, int]:
+    if _mutes is None:
+        load_restrictions()
+    return _mutes
+
+
+def _get_bans() -> dict[int, int]:
+    if _bans is None:
+        load_restrictions()
+    return _bans
+
+
+def _is_active(cache: dict[int, int], user_id: int) -> bool:
+    until = cache.get(user_id)
+    if until is None:
+        return False
+    if until == 0 or until > int(time.time()):
+        return True
+    # expired, the row is purged lazily by get_all_mutes/get_all_bans
+    cache.pop(user_id, None)
+    return False
 
 
 def get_banned_words() -> set[str]:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         cur = conn.execute("SELECT word FROM banned_words")
         return {row[0].lower() for row in cur.fetchall()}
 
 
 def get_banned_links() -> set[str]:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         cur = conn.execute("SELECT link FROM banned_links")
         return {row[0].lower() for row in cur.fetchall()}
 
 
+def banned_version() -> int:
+    """Return a counter that changes whenever banned words or links change."""
+    return _banned_version
+
+
 def add_banned_word(word: str) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    global _banned_version
+    with connect(MOD_DB_PATH) as conn:
         conn.execute(
             "INSERT OR IGNORE INTO banned_words(word) VALUES(?)",
             (word.lower(),),
         )
-        conn.commit()
+    _banned_version += 1
 
 
 def add_banned_link(link: str) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    global _banned_version
+    with connect(MOD_DB_PATH) as conn:
         conn.execute(
             "INSERT OR IGNORE INTO banned_links(link) VALUES(?)",
             (link.lower(),),
         )
-        conn.commit()
+    _banned_version += 1
 
 
 def add_warning(user_id: int, moderator_id: int = 0, reason: str = "") -> int:
     """Increase warning count, log and return new count."""
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         cur = conn.execute(
             """
             INSERT INTO warnings(user_id, count) VALUES(?, 1)
@@ -125,14 +224,14 @@ def add_warning(user_id: int, moderator_id: int = 0, reason: str = "") -> int:
             (user_id,),
         )
         count = cur.fetchone()[0]
-        conn.commit()
-    log_action(user_id, moderator_id, "warn", reason)
-    add_strike(user_id)
+        # one transaction when the log shares the database file
+        log_action(user_id, moderator_id, "warn", reason)
+        add_strike(user_id)
     return count
 
 
 def get_warnings(user_id: int) -> int:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         cur = conn.execute(
             "SELECT count FROM warnings WHERE user_id=?",
             (user_id,),
@@ -142,18 +241,17 @@ def get_warnings(user_id: int) -> int:
 
 
 def clear_warnings(user_id: int) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute(
             "DELETE FROM warnings WHERE user_id=?",
             (user_id,),
         )
-        conn.commit()
 
 
 def mute_user(user_id: int, seconds: int, moderator_id: int = 0, reason: str = "") -> int:
     """Mute user for given seconds. 0 means permanent mute."""
     until = 0 if seconds <= 0 else int(time.time() + seconds)
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute(
             """
             INSERT INTO mutes(user_id, until) VALUES(?, ?)
@@ -161,116 +259,102 @@ def mute_user(user_id: int, seconds: int, moderator_id: int = 0, reason: str = "
             """,
             (user_id, until),
         )
-        conn.commit()
-    log_action(user_id, moderator_id, "mute", reason)
+        log_action(user_id, moderator_id, "mute", reason)
+    _get_mutes()[user_id] = until
     return until
 
 
 def unmute_user(user_id: int) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute("DELETE FROM mutes WHERE user_id=?", (user_id,))
-        conn.commit()
+    _get_mutes().pop(user_id, None)
 
 
 def is_muted(user_id: int) -> bool:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
-        cur = conn.execute("SELECT until FROM mutes WHERE user_id=?", (user_id,))
-        row = cur.fetchone()
-        if not row:
-            return False
-        if row[0] == 0:
-            return True
-        if row[0] > int(time.time()):
-            return True
-        conn.execute("DELETE FROM mutes WHERE user_id=?", (user_id,))
-        conn.commit()
-        return False
+    return _is_active(_get_mutes(), user_id)
 
 
 def ban_user(user_id: int, seconds: int = 0, moderator_id: int = 0, reason: str = "") -> int:
     """Ban user for given seconds. 0 means permanent ban."""
     until = 0 if seconds <= 0 else int(time.time() + seconds)
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute(
             "INSERT INTO bans(user_id, until) VALUES(?, ?)"
             " ON CONFLICT(user_id) DO UPDATE SET until=excluded.until",
             (user_id, until),
         )
-        conn.commit()
-    log_action(user_id, moderator_id, "ban", reason)
+        log_action(user_id, moderator_id, "ban", reason)
+    _get_bans()[user_id] = until
     return until
 
 
 def unban_user(user_id: int) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute("DELETE FROM bans WHERE user_id=?", (user_id,))
-        conn.commit()
+    _get_bans().pop(user_id, None)
 
 
 def is_banned(user_id: int) -> bool:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
-        cur = conn.execute("SELECT until FROM bans WHERE user_id=?", (user_id,))
-        row = cur.fetchone()
-        if not row:
-            return False
-        if row[0] == 0:
-            return True
-        if row[0] > int(time.time()):
-            return True
-        conn.execute("DELETE FROM bans WHERE user_id=?", (user_id,))
-        conn.commit()
-        return False
+    return _is_active(_get_bans(), user_id)
 
 
 def get_all_mutes() -> list[tuple[int, int]]:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
+        conn.execute(
+            "DELETE FROM mutes WHERE until>0 AND until<=?",
+            (int(time.time()),),
+        )
         cur = conn.execute("SELECT user_id, until FROM mutes")
         return cur.fetchall()
 
 
 def get_all_bans() -> list[tuple[int, int]]:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
+        conn.execute(
+            "DELETE FROM bans WHERE until>0 AND until<=?",
+            (int(time.time()),),
+        )
         cur = conn.execute("SELECT user_id, until FROM bans")
         return cur.fetchall()
 
 
 def add_admin(user_id: int) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute(
             "INSERT OR IGNORE INTO admins(user_id) VALUES(?)",
             (user_id,),
         )
-        conn.commit()
+    _get_roles()[0].add(user_id)
 
 
 def remove_admin(user_id: int) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute("DELETE FROM admins WHERE user_id=?", (user_id,))
-        conn.commit()
+    _get_roles()[0].discard(user_id)
 
 
 def get_admins() -> list[int]:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         cur = conn.execute("SELECT user_id FROM admins")
         return [row[0] for row in cur.fetchall()]
 
 
 def add_moderator(user_id: int) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute(
             "INSERT OR IGNORE INTO moderators(user_id) VALUES(?)",
             (user_id,),
         )
-        conn.commit()
+    _get_roles()[1].add(user_id)
 
 
 def remove_moderator(user_id: int) -> None:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         conn.execute("DELETE FROM moderators WHERE user_id=?", (user_id,))
-        conn.commit()
+    _get_roles()[1].discard(user_id)
 
 
 def get_moderators() -> list[int]:
-    with sqlite3.connect(MOD_DB_PATH) as conn:
+    with connect(MOD_DB_PATH) as conn:
         cur = conn.execute("SELECT user_id FROM moderators")
         return [row[0] for row in cur.fetchall()]
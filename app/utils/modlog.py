@@ -1,51 +1,55 @@
-import sqlite3
 import time
 from pathlib import Path
 
+from .connection import connect
+from .migrations import Step, migrate
+
 LOG_DB_PATH = Path(__file__).resolve().parent.parent / "moderation_log.db"
 
 
+MODLOG_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS logs(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        moderator_id INTEGER,
+        action TEXT,
+        reason TEXT,
+        timestamp INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS strikes(
+        user_id INTEGER PRIMARY KEY,
+        count INTEGER DEFAULT 0,
+        last_timestamp INTEGER
+    )
+    """,
+    # daily counters and top offenders of get_mod_stats
+    "CREATE INDEX IF NOT EXISTS idx_logs_action_timestamp ON logs(action, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_logs_user ON logs(user_id)",
+]
+
+
 def init_modlog_db() -> None:
     """Initialize database for moderation logs and strikes."""
-    with sqlite3.connect(LOG_DB_PATH) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS logs(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                moderator_id INTEGER,
-                action TEXT,
-                reason TEXT,
-                timestamp INTEGER
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS strikes(
-                user_id INTEGER PRIMARY KEY,
-                count INTEGER DEFAULT 0,
-                last_timestamp INTEGER
-            )
-            """
-        )
-        conn.commit()
+    with connect(LOG_DB_PATH) as conn:
+        migrate(conn, "modlog", MODLOG_MIGRATIONS)
 
 
 def log_action(user_id: int, moderator_id: int, action: str, reason: str = "") -> None:
     """Log moderation action."""
-    with sqlite3.connect(LOG_DB_PATH) as conn:
+    with connect(LOG_DB_PATH) as conn:
         conn.execute(
             "INSERT INTO logs(user_id, moderator_id, action, reason, timestamp) VALUES(?,?,?,?,?)",
             (user_id, moderator_id, action, reason, int(time.time())),
         )
-        conn.commit()
 
 
 def add_strike(user_id: int) -> int:
     """Increase strike count for a user and return new count."""
     ts = int(time.time())
-    with sqlite3.connect(LOG_DB_PATH) as conn:
+    with connect(LOG_DB_PATH) as conn:
         cur = conn.execute(
             """
             INSERT INTO strikes(user_id, count, last_timestamp) VALUES(?, 1, ?)
@@ -55,27 +59,25 @@ def add_strike(user_id: int) -> int:
             (user_id, ts),
         )
         row = cur.fetchone()
-        conn.commit()
         return row[0] if row else 1
 
 
 def get_strikes(user_id: int) -> int:
-    with sqlite3.connect(LOG_DB_PATH) as conn:
+    with connect(LOG_DB_PATH) as conn:
         cur = conn.execute("SELECT count FROM strikes WHERE user_id=?", (user_id,))
         row = cur.fetchone()
         return row[0] if row else 0
 
 
 def clear_strikes(user_id: int) -> None:
-    with sqlite3.connect(LOG_DB_PATH) as conn:
+    with connect(LOG_DB_PATH) as conn:
         conn.execute("DELETE FROM strikes WHERE user_id=?", (user_id,))
-        conn.commit()
 
 
 def get_mod_stats() -> dict:
     """Return moderation statistics for the last 24 hours and top offenders."""
     day_ago = int(time.time()) - 86400
-    with sqlite3.connect(LOG_DB_PATH) as conn:
+    with connect(LOG_DB_PATH) as conn:
         cur = conn.execute(
             "SELECT COUNT(*) FROM logs WHERE action='warn' AND timestamp>=?",
             (day_ago,),
@@ -0,0 +1,297 @@
+"""Central pacing of outgoing Bot API calls.
+
+``OutboundDispatcher`` is an aiogram request middleware, so every call made
+through the bot (``message.answer``, ``bot.restrict_chat_member``, ...)
+passes through it. It
+
+* paces all calls with a global token bucket that serves waiting calls by
+  priority: moderation actions first, then interactive replies, then
+  broadcasts;
+* paces messages to a single chat below Telegram's per-chat limits;
+* waits out ``RetryAfter`` and retries, pausing the target chat or, for
+  calls without a chat, all calls; idempotent calls are also retried
+  after server and network errors;
+* shares one request between identical concurrent ``get*`` calls;
+* counts sent, failed, retried and coalesced calls.
+
+Code sending in bulk marks its calls with ``with priority(Priority.BROADCAST)``.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Iterable, Iterator
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType, Response
+
+from .ratelimit import TokenBucket
+
+GLOBAL_RATE = 30  # calls per second, Telegram's global limit
+CHAT_RATE = 1.0  # messages per second to one private chat
+GROUP_RATE = 20 / 60  # messages per second to one group
+CHAT_BURST = 3  # messages a chat may receive at once before pacing kicks in
+MAX_CHAT_BUCKETS = 10_000  # least recently used chat buckets are dropped
+MAX_RETRIES = 3
+MAX_RETRY_AFTER = 60  # longer flood waits are not waited out, the error is raised
+BACKOFF = 1.0  # first delay after a server or network error, doubled each retry
+
+MODERATION_METHODS = {
+    "RestrictChatMember",
+    "BanChatMember",
+    "UnbanChatMember",
+    "DeleteMessage",
+    "DeleteMessages",
+}
+# safe to repeat when it is unknown whether the first attempt reached Telegram
+IDEMPOTENT_PREFIXES = ("Get", "Delete", "Restrict", "Ban", "Unban", "Set", "Edit")
+SEND_PREFIXES = ("Send", "Copy", "Forward")
+# long polling has its own backoff and must never wait behind other calls
+PASSTHROUGH_METHODS = {"GetUpdates"}
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    MODERATION = 0
+    INTERACTIVE = 1
+    BROADCAST = 2
+
+
+_priority: contextvars.ContextVar[Priority | None] = contextvars.ContextVar(
+    "outbound_priority", default=None
+)
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Send calls made inside the block (and tasks started in it) with ``level``."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class PriorityBucket:
+    """Token bucket handing tokens to waiters in priority order."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the given time (e.g. after RetryAfter)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, level: int) -> float:
+        """Wait for a token and return the time waited."""
+        now = time.monotonic()
+        self._refill(now)
+        if not self._waiters and now >= self._paused_until and self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (level, next(self._seq), future))
+        self._schedule(now)
+        await future
+        return time.monotonic() - now
+
+    def _schedule(self, now: float) -> None:
+        if self._timer is not None:
+            return
+        delay = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0.0)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        waiters = self._waiters
+        while waiters and now >= self._paused_until and self._tokens >= 1:
+            _, _, future = heapq.heappop(waiters)
+            if future.done():
+                # the waiting call was cancelled
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        while waiters and waiters[0][2].done():
+            heapq.heappop(waiters)
+        if waiters:
+            self._schedule(now)
+
+
+class OutboundDispatcher(BaseRequestMiddleware):
+    """Request middleware applying limits, priorities and retries."""
+
+    def __init__(
+        self,
+        moderation_chats: Iterable[int] = (),
+        rate: float = GLOBAL_RATE,
+    ) -> None:
+        self.moderation_chats = set(moderation_chats)
+        self._global = PriorityBucket(rate)
+        self._chats: OrderedDict[int | str, TokenBucket] = OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self.counters = {
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "coalesced": 0,
+            "throttled": 0,
+            "throttle_wait": 0.0,
+        }
+        self.by_priority = {level.name.lower(): 0 for level in Priority}
+
+    def _classify(self, method: TelegramMethod) -> Priority:
+        level = _priority.get()
+        if level is not None:
+            return level
+        chat_id = getattr(method, "chat_id", None)
+        name = type(method).__name__
+        if chat_id in self.moderation_chats:
+            return Priority.MODERATION
+        if name in MODERATION_METHODS and not (isinstance(chat_id, int) and chat_id > 0):
+            # deleting menus in private chats is housekeeping, not moderation
+            return Priority.MODERATION
+        return Priority.INTERACTIVE
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            rate = CHAT_RATE if is_private else GROUP_RATE
+            bucket = self._chats[chat_id] = TokenBucket(rate, CHAT_BURST)
+            if len(self._chats) > MAX_CHAT_BUCKETS:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        if name in PASSTHROUGH_METHODS:
+            return await make_request(bot, method)
+        if not name.startswith("Get"):
+            return await self._send(make_request, bot, method)
+        key = (name, method.model_dump_json())
+        future = self._inflight.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._send(make_request, bot, method)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # waiters get the error, nobody has to retrieve it here
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            del self._inflight[key]
+
+    async def _send(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        level = self._classify(method)
+        chat_id = getattr(method, "chat_id", None)
+        chat_bucket = (
+            self._chat_bucket(chat_id)
+            if chat_id is not None and name.startswith(SEND_PREFIXES)
+            else None
+        )
+        retries = 0
+        while True:
+            waited = 0.0
+            if chat_bucket is not None:
+                start = time.monotonic()
+                await chat_bucket.acquire()
+                waited += time.monotonic() - start
+            waited += await self._global.acquire(level)
+            if waited:
+                self.counters["throttled"] += 1
+                self.counters["throttle_wait"] += waited
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if retries >= MAX_RETRIES or e.retry_after > MAX_RETRY_AFTER:
+                    self._failed(name, e, logging.WARNING)
+                    raise
+                if chat_id is not None:
+                    # only this chat is flooded; edits and deletes are not
+                    # paced per chat, so their retry now waits on its bucket
+                    chat_bucket = chat_bucket or self._chat_bucket(chat_id)
+                    chat_bucket.pause(e.retry_after)
+                else:
+                    # not tied to a chat: the whole bot is flooding, so
+                    # every call waits, and this one retries after the pause
+                    self._global.pause(e.retry_after)
+            except (TelegramServerError, TelegramNetworkError) as e:
+                if retries >= MAX_RETRIES or not name.startswith(IDEMPOTENT_PREFIXES):
+                    self._failed(name, e, logging.WARNING)
+                    raise
+                await asyncio.sleep(BACKOFF * 2 ** retries)
+            except Exception as e:
+                # bad requests are the caller's business, it sees the error
+                self._failed(name, e, logging.DEBUG)
+                raise
+            else:
+                self.counters["sent"] += 1
+                self.by_priority[level.name.lower()] += 1
+                return response
+            retries += 1
+            self.counters["retried"] += 1
+
+    def _failed(self, name: str, error: Exception, level: int) -> None:
+        self.counters["failed"] += 1
+        logger.log(level, "%s failed: %s", name, error)
+
+    def stats(self) -> dict:
+        """Return call counters, per-priority counts and waiting calls."""
+        return {
+            **self.counters,
+            **{f"sent_{name}": count for name, count in self.by_priority.items()},
+            "waiting": len(self._global._waiters),
+            "tracked_chats": len(self._chats),
+        }
+
+
+def setup_outbound(bot: Bot, moderation_chats: Iterable[int] = ()) -> OutboundDispatcher:
+    """Route all calls of ``bot`` through a new ``OutboundDispatcher``."""
+    dispatcher = OutboundDispatcher(moderation_chats)
+    bot.session.middleware(dispatcher)
+    return dispatcher
@@ -0,0 +1,104 @@
+"""Tournament results and the score changes they cause.
+
+A batch of results, usually one tournament or one uploaded CSV file, is
+applied by ``apply_results`` in one transaction: the entries are stored,
+their points are added to the ratings table and the batch key is recorded,
+so applying the same batch again changes nothing. Afterwards only the
+players whose score changed are moved on the leaderboard.
+"""
+import csv
+import hashlib
+import io
+import json
+import time
+from typing import Iterable
+
+from . import database, leaderboard
+from .connection import connect
+
+# points for a placement when a result has no explicit score change
+PLACEMENT_POINTS = {1: 100, 2: 70, 3: 50, 4: 30}
+PARTICIPATION_POINTS = 10
+
+# (user_id, placement, delta); a missing delta is taken from the placement
+Result = tuple[int, int | None, int | None]
+
+
+def placement_points(placement: int | None) -> int:
+    return PLACEMENT_POINTS.get(placement, PARTICIPATION_POINTS)
+
+
+def apply_results(key: str, results: Iterable[Result], tournament_id: int | None = None) -> int | None:
+    """Apply a batch of results and return the number of players it changed.
+
+    Returns None if a batch with the same ``key`` was applied before.
+    """
+    entries = []
+    deltas: dict[int, int] = {}
+    for user_id, placement, delta in results:
+        if delta is None:
+            delta = placement_points(placement)
+        entries.append((key, user_id, placement, delta))
+        deltas[user_id] = deltas.get(user_id, 0) + delta
+    with connect(database.TOURNAMENT_DB_PATH) as conn:
+        new = conn.execute(
+            """
+            INSERT INTO result_batches(key, tournament_id, entries, applied)
+            VALUES(?, ?, ?, ?) ON CONFLICT(key) DO NOTHING
+            """,
+            (key, tournament_id, len(entries), int(time.time())),
+        ).rowcount
+        if not new:
+            return None
+        conn.executemany(
+            "INSERT INTO results(batch, user_id, placement, delta) VALUES(?, ?, ?, ?)",
+            entries,
+        )
+        conn.executemany(
+            """
+            INSERT INTO ratings(user_id, score) VALUES(?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET score = score + excluded.score
+            """,
+            deltas.items(),
+        )
+        scores = conn.execute(
+            "SELECT user_id, score FROM ratings WHERE user_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(deltas)),),
+        ).fetchall()
+    for user_id, score in scores:
+        leaderboard.set_score(user_id, score)
+    return len(scores)
+
+
+def _optional_int(value: str) -> int | None:
+    value = value.strip()
+    return int(value) if value else None
+
+
+def parse_results_csv(text: str) -> list[Result]:
+    """Parse ``user_id,placement,delta`` lines; a header line is skipped.
+
+    Either placement or delta may be empty. Raises ValueError naming the
+    first malformed line.
+    """
+    results = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), 1):
+        if not row or not "".join(row).strip():
+            continue
+        if line_no == 1 and not row[0].strip().lstrip("-").isdigit():
+            continue
+        try:
+            user_id = int(row[0])
+            placement = _optional_int(row[1]) if len(row) > 1 else None
+            delta = _optional_int(row[2]) if len(row) > 2 else None
+        except ValueError:
+            raise ValueError(f"Malformed result on line {line_no}: {','.join(row)}") from None
+        results.append((user_id, placement, delta))
+    return results
+
+
+def import_results_csv(data: bytes, tournament_id: int | None = None) -> int | None:
+    """Apply results from CSV file contents, at most once per file and tournament."""
+    digest = hashlib.sha256(data).hexdigest()
+    results = parse_results_csv(data.decode("utf-8-sig"))
+    return apply_results(f"csv:{tournament_id}:{digest}", results, tournament_id)
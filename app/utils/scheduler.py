@@ -0,0 +1,84 @@
+"""Bounded concurrent update processing with per-user ordering.
+
+Plugged into the dispatcher as its FSM event isolation, so it runs before
+the FSM state is loaded. Updates of the same user in the same chat are
+handled strictly one after another in arrival order (keeping Suggest,
+FeedbackState, JoinState and admin flows consistent), while updates of
+different users run concurrently up to ``max_concurrent`` at a time.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+
+class _KeyLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class UpdateScheduler(BaseEventIsolation):
+    """Per-key FIFO locks plus a global concurrency limit, with metrics."""
+
+    def __init__(self, max_concurrent: int = 50) -> None:
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._locks: dict[StorageKey, _KeyLock] = {}
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = _KeyLock()
+        entry.users += 1
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        queued = True
+        start = time.monotonic()
+        try:
+            async with entry.lock, self._semaphore:
+                wait = time.monotonic() - start
+                queued = False
+                self.waiting -= 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                try:
+                    yield
+                finally:
+                    self.running -= 1
+                    self.processed += 1
+        finally:
+            if queued:
+                # cancelled before its turn came
+                self.waiting -= 1
+            entry.users -= 1
+            if entry.users == 0:
+                # drop locks of idle users so the map does not grow forever
+                del self._locks[key]
+
+    def stats(self) -> dict:
+        """Return queue depth and wait time metrics."""
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "max_waiting": self.max_waiting,
+            "processed": self.processed,
+            "avg_wait": self.total_wait / self.processed if self.processed else 0.0,
+            "max_wait": self.max_wait,
+            "tracked_keys": len(self._locks),
+        }
+
+    async def close(self) -> None:
+        self._locks.clear()
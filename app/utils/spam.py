@@ -1,8 +1,8 @@
-from datetime import datetime
 import re
 import time
 
-from .moderation import get_banned_words, get_banned_links
+from .limiter import LimiterBackend, MemoryLimiterBackend, UserState, text_hash
+from .moderation import get_banned_words, get_banned_links, banned_version
 
 # Maximum number of messages a user can send per day
 # Includes proposals, feedback and any other text input
@@ -15,15 +15,60 @@ MIN_EMOJI_COUNT = 3
 
 EMOJI_RE = re.compile(r"[\U0001F300-\U0001FAD6\U0001F600-\U0001F6FF]")
 
-user_stats: dict[int, dict] = {}
+_backend: LimiterBackend = MemoryLimiterBackend(FLOOD_MESSAGE_COUNT)
 
 
-def _load_banned_words() -> set[str]:
-    return get_banned_words()
+def set_limiter_backend(backend: LimiterBackend) -> None:
+    """Replace where per-user limiter state is stored."""
+    global _backend
+    _backend = backend
 
 
-def _load_banned_links() -> set[str]:
-    return get_banned_links()
+def get_limiter_backend() -> LimiterBackend:
+    return _backend
+
+
+# compiled banned word/link matchers and the moderation version they reflect
+_matcher_version = -1
+_banned_words_re: re.Pattern | None = None
+_banned_links_re: re.Pattern | None = None
+
+
+def _trie_regex(items: set[str]) -> re.Pattern | None:
+    """Compile substrings into one regex shaped like a prefix trie.
+
+    Shared prefixes are merged, so the work at each text position depends on
+    the length of the entries rather than on how many there are.
+    """
+    trie: dict = {}
+    for item in items:
+        if not item:
+            continue
+        node = trie
+        for ch in item:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    if not trie:
+        return None
+
+    def build(node: dict) -> str:
+        # a shorter entry already ends here, longer ones cannot add a match
+        if "" in node:
+            return ""
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    return re.compile(build(trie))
+
+
+def _refresh_matchers() -> None:
+    global _matcher_version, _banned_words_re, _banned_links_re
+    version = banned_version()
+    if version == _matcher_version:
+        return
+    _banned_words_re = _trie_regex(get_banned_words())
+    _banned_links_re = _trie_regex(get_banned_links())
+    _matcher_version = version
 
 
 def _count_emojis(text: str) -> int:
@@ -32,37 +77,24 @@ def _count_emojis(text: str) -> int:
 
 def check_message_allowed(user_id: int, text: str) -> tuple[bool, str | None]:
     """Verify spam limits and filter content."""
-    data = user_stats.get(user_id)
     now = time.time()
-    today = datetime.utcnow().date()
-
-    if data is None or data.get("day") != today:
-        data = {
-            "count": 0,
-            "last_time": 0.0,
-            "day": today,
-            "timestamps": [],
-            "last_text": "",
-        }
-        user_stats[user_id] = data
-
-    if now - data["last_time"] < MIN_INTERVAL_SEC:
+    # UTC day number, changes at the same moment as utcnow().date()
+    with _backend.state(user_id, int(now // 86400)) as data:
+        return _check(data, now, text)
+
+
+def _check(data: UserState, now: float, text: str) -> tuple[bool, str | None]:
+    if now - data.last_time < MIN_INTERVAL_SEC:
         return False, "Пожалуйста, не спамьте. Подождите немного."
 
-    if data["count"] >= MAX_MESSAGES_PER_DAY:
+    if data.count >= MAX_MESSAGES_PER_DAY:
         return False, "Превышен лимит сообщений на сегодня."
 
-    timestamps = data["timestamps"]
-    timestamps.append(now)
-    while len(timestamps) > FLOOD_MESSAGE_COUNT:
-        timestamps.pop(0)
-    if (
-        len(timestamps) == FLOOD_MESSAGE_COUNT
-        and now - timestamps[0] <= FLOOD_TIME_WINDOW
-    ):
+    if now - data.push_time(now) <= FLOOD_TIME_WINDOW:
         return False, "Флуд: слишком много сообщений подряд."
 
-    if text == data.get("last_text") and text:
+    digest = text_hash(text)
+    if text and digest == data.last_text_hash:
         return False, "Повторяющийся контент."
 
     letters = [ch for ch in text if ch.isalpha()]
@@ -74,15 +106,14 @@ def check_message_allowed(user_id: int, text: str) -> tuple[bool, str | None]:
 
     text_lower = (text or "").lower()
 
-    for word in _load_banned_words():
-        if word in text_lower:
-            return False, "Сообщение содержит запрещенные слова."
+    _refresh_matchers()
+    if _banned_words_re and _banned_words_re.search(text_lower):
+        return False, "Сообщение содержит запрещенные слова."
 
-    for link in _load_banned_links():
-        if link in text_lower:
-            return False, "Сообщение содержит запрещенные ссылки."
+    if _banned_links_re and _banned_links_re.search(text_lower):
+        return False, "Сообщение содержит запрещенные ссылки."
 
-    data["count"] += 1
-    data["last_time"] = now
-    data["last_text"] = text
+    data.count += 1
+    data.last_time = now
+    data.last_text_hash = digest
     return True, None
@@ -0,0 +1,259 @@
+"""Persistent queue of content suggestions waiting for moderation.
+
+A submission is ``pending`` until a moderator presses approve or reject,
+then ``awaiting_comment`` until the moderator comments or skips, and
+finally ``approved`` or ``rejected``. Submissions nobody finished within
+``SUBMISSION_TTL`` become ``expired``. Open submissions and the moderator
+to submission mapping are cached in memory, so the mod chat handlers do
+not query the database for every message.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from .connection import connect, run
+from .migrations import Step, migrate
+
+SUBMISSIONS_DB_PATH = Path(__file__).resolve().parent.parent / "submissions.db"
+
+SUBMISSION_TTL = 7 * 24 * 3600  # open submissions expire after a week
+EXPIRE_INTERVAL = 3600  # seconds between expiry runs
+MAX_CACHED = 1000  # open submissions kept in memory
+
+OPEN_STATUSES = ("pending", "awaiting_comment")
+
+logger = logging.getLogger(__name__)
+
+# mod chat message_id -> open submission, least recently used first
+_cache: OrderedDict[int, dict] = OrderedDict()
+# moderator_id -> mod chat message_id of the submission waiting for a comment
+_awaiting: dict[int, int] = {}
+_expirer: asyncio.Task | None = None
+
+_COLUMNS = "id, mod_message_id, user_id, type, status, decision, moderator_id, created, decided"
+
+
+def _row_to_dict(row: tuple) -> dict:
+    return dict(zip(_COLUMNS.split(", "), row))
+
+
+def _remember(entry: dict) -> None:
+    _cache[entry["mod_message_id"]] = entry
+    _cache.move_to_end(entry["mod_message_id"])
+    while len(_cache) > MAX_CACHED:
+        _cache.popitem(last=False)
+
+
+def _forget(mod_message_id: int) -> None:
+    _cache.pop(mod_message_id, None)
+    for moderator_id, msg_id in list(_awaiting.items()):
+        if msg_id == mod_message_id:
+            del _awaiting[moderator_id]
+
+
+SUBMISSIONS_MIGRATIONS: list[Step] = [
+    """
+    CREATE TABLE IF NOT EXISTS submissions(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        mod_message_id INTEGER UNIQUE,
+        user_id INTEGER,
+        type TEXT,
+        status TEXT DEFAULT 'pending',
+        decision TEXT,
+        moderator_id INTEGER,
+        created INTEGER,
+        decided INTEGER,
+        finished INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_submissions_status_created ON submissions(status, created)",
+    # decisions and expiries of the last day in get_queue_stats
+    "CREATE INDEX IF NOT EXISTS idx_submissions_status_finished ON submissions(status, finished)",
+]
+
+
+def init_submissions_db() -> None:
+    """Initialize the submission queue and load moderators' open decisions."""
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        migrate(conn, "submissions", SUBMISSIONS_MIGRATIONS)
+    load_awaiting()
+
+
+def load_awaiting() -> None:
+    """Reload the moderator to submission mapping from the database."""
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        rows = conn.execute(
+            """
+            SELECT moderator_id, mod_message_id FROM submissions
+            WHERE status='awaiting_comment' ORDER BY decided
+            """
+        ).fetchall()
+    _awaiting.clear()
+    # the latest decision of each moderator wins, like before a restart
+    _awaiting.update(rows)
+
+
+def add_submission(mod_message_id: int, user_id: int, ctype: str) -> None:
+    """Queue a submission posted to the mod chat as ``mod_message_id``."""
+    now = int(time.time())
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        row = conn.execute(
+            f"""
+            INSERT INTO submissions(mod_message_id, user_id, type, status, created)
+            VALUES(?, ?, ?, 'pending', ?)
+            RETURNING {_COLUMNS}
+            """,
+            (mod_message_id, user_id, ctype, now),
+        ).fetchone()
+    _remember(_row_to_dict(row))
+
+
+def get_submission(mod_message_id: int) -> dict | None:
+    """Return an open submission by its mod chat message id."""
+    entry = _cache.get(mod_message_id)
+    if entry is not None:
+        _cache.move_to_end(mod_message_id)
+        return entry
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        row = conn.execute(
+            f"""
+            SELECT {_COLUMNS} FROM submissions
+            WHERE mod_message_id=? AND status IN (?, ?)
+            """,
+            (mod_message_id, *OPEN_STATUSES),
+        ).fetchone()
+    if not row:
+        return None
+    entry = _row_to_dict(row)
+    _remember(entry)
+    return entry
+
+
+def awaiting_comment(moderator_id: int) -> int | None:
+    """Return mod chat message id of the submission the moderator decided last."""
+    return _awaiting.get(moderator_id)
+
+
+def decide_submission(mod_message_id: int, moderator_id: int, decision: str) -> dict | None:
+    """Store moderator's decision ("approve" or "reject") and wait for a comment."""
+    now = int(time.time())
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        row = conn.execute(
+            f"""
+            UPDATE submissions
+            SET status='awaiting_comment', decision=?, moderator_id=?, decided=?
+            WHERE mod_message_id=? AND status IN (?, ?)
+            RETURNING {_COLUMNS}
+            """,
+            (decision, moderator_id, now, mod_message_id, *OPEN_STATUSES),
+        ).fetchone()
+    # another moderator may have decided it before, the last decision wins
+    _forget(mod_message_id)
+    if not row:
+        return None
+    entry = _row_to_dict(row)
+    _remember(entry)
+    _awaiting[moderator_id] = mod_message_id
+    return entry
+
+
+def finish_submission(mod_message_id: int) -> dict | None:
+    """Close a decided submission and return it, or None if already closed.
+
+    The status change is conditional, so a comment and a skip arriving at
+    the same time cannot both notify the author.
+    """
+    now = int(time.time())
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        row = conn.execute(
+            f"""
+            UPDATE submissions
+            SET status=CASE decision WHEN 'approve' THEN 'approved' ELSE 'rejected' END,
+                finished=?
+            WHERE mod_message_id=? AND status='awaiting_comment'
+            RETURNING {_COLUMNS}
+            """,
+            (now, mod_message_id),
+        ).fetchone()
+    _forget(mod_message_id)
+    return _row_to_dict(row) if row else None
+
+
+def expire_submissions(max_age: int = SUBMISSION_TTL) -> int:
+    """Mark open submissions older than ``max_age`` seconds as expired."""
+    now = int(time.time())
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        rows = conn.execute(
+            """
+            UPDATE submissions SET status='expired', finished=?
+            WHERE status IN (?, ?) AND created < ?
+            RETURNING mod_message_id
+            """,
+            (now, *OPEN_STATUSES, now - max_age),
+        ).fetchall()
+    for (mod_message_id,) in rows:
+        _forget(mod_message_id)
+    return len(rows)
+
+
+def get_queue_stats() -> dict:
+    """Return queue length and decision time statistics for the last 24 hours."""
+    now = int(time.time())
+    day_ago = now - 86400
+    with connect(SUBMISSIONS_DB_PATH) as conn:
+        counts = dict(
+            conn.execute(
+                "SELECT status, COUNT(*) FROM submissions WHERE status IN (?, ?) GROUP BY status",
+                OPEN_STATUSES,
+            ).fetchall()
+        )
+        oldest = conn.execute(
+            "SELECT MIN(created) FROM submissions WHERE status='pending'"
+        ).fetchone()[0]
+        decided, avg_decision = conn.execute(
+            """
+            SELECT COUNT(*), AVG(decided - created) FROM submissions
+            WHERE status IN ('approved', 'rejected') AND finished >= ?
+            """,
+            (day_ago,),
+        ).fetchone()
+        expired = conn.execute(
+            "SELECT COUNT(*) FROM submissions WHERE status='expired' AND finished >= ?",
+            (day_ago,),
+        ).fetchone()[0]
+    return {
+        "pending": counts.get("pending", 0),
+        "awaiting_comment": counts.get("awaiting_comment", 0),
+        "oldest_pending_age": now - oldest if oldest else 0,
+        "decided_24h": decided,
+        "avg_decision_time": avg_decision or 0.0,
+        "expired_24h": expired,
+    }
+
+
+async def _run_expirer() -> None:
+    while True:
+        expired = await run(SUBMISSIONS_DB_PATH, expire_submissions)
+        if expired:
+            logger.info("Expired %d unmoderated submissions", expired)
+        await asyncio.sleep(EXPIRE_INTERVAL)
+
+
+def start_expirer() -> None:
+    """Start periodic expiry of abandoned submissions in the running event loop."""
+    global _expirer
+    if _expirer is None:
+        _expirer = asyncio.get_running_loop().create_task(_run_expirer())
+
+
+async def stop_expirer() -> None:
+    global _expirer
+    if _expirer is not None:
+        _expirer.cancel()
+        try:
+            await _expirer
+        except asyncio.CancelledError:
+            pass
+        _expirer = None
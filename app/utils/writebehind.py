@@ -0,0 +1,112 @@
+"""Write-behind buffer for forum activity in users.db.
+
+Profile upserts and XP increments are coalesced per user in memory and
+written in a single transaction every ``FLUSH_INTERVAL`` seconds, or earlier
+once ``FLUSH_THRESHOLD`` users are pending. A hard crash loses at most one
+interval of forum XP; a normal shutdown flushes everything.
+"""
+import asyncio
+import logging
+import time
+
+from aiogram.types import User
+
+from .aio import apply_user_batch
+
+FLUSH_INTERVAL = 5.0  # seconds, upper bound of the data loss window
+FLUSH_THRESHOLD = 500  # pending users that trigger an early flush
+
+logger = logging.getLogger(__name__)
+
+_profiles: dict[int, tuple[str, str]] = {}
+_xp: dict[int, int] = {}
+_flush_lock: asyncio.Lock | None = None
+_flusher: asyncio.Task | None = None
+_pending_tasks: set[asyncio.Task] = set()
+
+flush_stats = {
+    "flushes": 0,
+    "users_flushed": 0,
+    "last_size": 0,
+    "last_latency": 0.0,
+    "max_latency": 0.0,
+    "failures": 0,
+}
+
+
+def queue_activity(user: User, xp: int = 0) -> None:
+    """Remember user's profile and XP gain to be written on the next flush."""
+    _profiles[user.id] = (user.full_name, user.username or "")
+    if xp:
+        _xp[user.id] = _xp.get(user.id, 0) + xp
+    if len(_profiles) >= FLUSH_THRESHOLD:
+        task = asyncio.get_running_loop().create_task(flush())
+        _pending_tasks.add(task)
+        task.add_done_callback(_pending_tasks.discard)
+
+
+def pending() -> int:
+    """Return number of users waiting to be flushed."""
+    return len(_profiles)
+
+
+def get_flush_stats() -> dict:
+    """Return flush counters and latencies along with the pending users."""
+    return {"pending": len(_profiles), **flush_stats}
+
+
+async def flush() -> None:
+    """Write all buffered activity in one transaction."""
+    global _profiles, _xp, _flush_lock
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+    async with _flush_lock:
+        if not _profiles and not _xp:
+            return
+        profiles, xp = _profiles, _xp
+        _profiles, _xp = {}, {}
+        start = time.perf_counter()
+        try:
+            await apply_user_batch(profiles, xp)
+        except Exception:
+            flush_stats["failures"] += 1
+            logger.exception("Failed to flush %d buffered users", len(profiles))
+            # keep the batch for the next attempt, newer data wins for profiles
+            for uid, profile in profiles.items():
+                _profiles.setdefault(uid, profile)
+            for uid, amount in xp.items():
+                _xp[uid] = _xp.get(uid, 0) + amount
+            return
+        latency = time.perf_counter() - start
+        flush_stats["flushes"] += 1
+        flush_stats["users_flushed"] += len(profiles)
+        flush_stats["last_size"] = len(profiles)
+        flush_stats["last_latency"] = latency
+        flush_stats["max_latency"] = max(flush_stats["max_latency"], latency)
+        logger.debug("Flushed %d users in %.1f ms", len(profiles), latency * 1000)
+
+
+async def _run_flusher() -> None:
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await flush()
+
+
+def start_flusher() -> None:
+    """Start periodic flushing in the running event loop."""
+    global _flusher
+    if _flusher is None:
+        _flusher = asyncio.get_running_loop().create_task(_run_flusher())
+
+
+async def stop_flusher() -> None:
+    """Stop periodic flushing and write everything still buffered."""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        try:
+            await _flusher
+        except asyncio.CancelledError:
+            pass
+        _flusher = None
+    await flush()
@@ -0,0 +1,55 @@
+"""Webhook runtime: Telegram pushes updates to an aiohttp server.
+
+Used instead of long polling when ``WEBHOOK_URL`` is set. Every worker
+serves the same path, so several of them can run behind a load balancer.
+"""
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+async def _health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def build_app(dp: Dispatcher, bot: Bot, config: Config) -> web.Application:
+    """Create aiohttp application serving the webhook and ``/health``."""
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.webhook_secret or None,
+    ).register(app, path=config.webhook_path)
+    app.router.add_get("/health", _health)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, config: Config) -> None:
+    """Register the webhook with Telegram and serve updates until cancelled."""
+    app = build_app(dp, bot, config)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, config.webapp_host, config.webapp_port)
+    await site.start()
+    await bot.set_webhook(
+        config.webhook_url.rstrip("/") + config.webhook_path,
+        secret_token=config.webhook_secret or None,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info(
+        "Webhook server listening on %s:%s%s",
+        config.webapp_host, config.webapp_port, config.webhook_path,
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
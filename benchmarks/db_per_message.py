@@ -0,0 +1,79 @@
+"""Measure the SQLite cost of one clean forum message.
+
+Replays the database calls made by ``forum.moderate_group_message`` for a
+message that passes all filters, first with a fresh ``sqlite3.connect`` per
+call (the old behaviour) and then through the pooled connection layer.
+
+Usage: python benchmarks/db_per_message.py [messages]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import achievements, connection, database, moderation, modlog  # noqa: E402
+
+MODULES = (database, moderation, modlog, achievements)
+
+
+@contextmanager
+def _fresh_connect(path):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _use_dir(directory: Path) -> None:
+    database.DB_PATH = directory / "users.db"
+    database.TOURNAMENT_DB_PATH = directory / "tournaments.db"
+    database.TOURNAMENT_INFO_DB_PATH = directory / "tournaments_info.db"
+    moderation.MOD_DB_PATH = directory / "moderation.db"
+    modlog.LOG_DB_PATH = directory / "moderation_log.db"
+    achievements.DB_PATH = directory / "achievements.db"
+
+
+def _run(messages: int) -> float:
+    database.init_db()
+    moderation.init_moderation_db()
+    modlog.init_modlog_db()
+    start = time.perf_counter()
+    for i in range(messages):
+        user = SimpleNamespace(id=i % 500, full_name=f"User {i % 500}", username=f"user{i % 500}")
+        moderation.is_muted(user.id)
+        moderation.get_banned_words()
+        moderation.get_banned_links()
+        database.add_user(user)
+        database.add_xp(user.id, 1)
+    return (time.perf_counter() - start) / messages
+
+
+def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as before_dir, tempfile.TemporaryDirectory() as after_dir:
+        _use_dir(Path(before_dir))
+        for module in MODULES:
+            module.connect = _fresh_connect
+        before = _run(messages)
+
+        _use_dir(Path(after_dir))
+        for module in MODULES:
+            module.connect = connection.connect
+        after = _run(messages)
+        connection.close_all()
+
+    print(f"messages:          {messages}")
+    print(f"per-call connect:  {before * 1e6:9.1f} us/message")
+    print(f"pooled connection: {after * 1e6:9.1f} us/message")
+    print(f"speedup:           {before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
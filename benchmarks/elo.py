@@ -0,0 +1,56 @@
+"""Measure the Elo engine on synthetic match history.
+
+``matches`` random matches between ``players`` players across the three
+games and levels are written to a temporary database. The full history is
+then replayed, and finally single matches are recorded one by one, as the
+bot does.
+
+Usage: python benchmarks/elo.py [matches] [players]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import bootstrap, connection, database, elo  # noqa: E402
+
+GAMES = ("CS2", "Dota 2", "Valorant")
+LEVELS = ("Уровень: Новичок", "Уровень: Любитель", "Уровень: Про")
+SINGLE_MATCHES = 1000
+
+
+def _matches(count: int, players: int):
+    for _ in range(count):
+        winner, loser = random.sample(range(1, players + 1), 2)
+        yield (random.choice(GAMES), random.choice(LEVELS), winner, loser, int(random.random() < 0.05))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        bootstrap.bootstrap("single", Path(tmp) / "bot.db")
+        with connection.connect(database.TOURNAMENT_DB_PATH) as conn:
+            conn.executemany(
+                "INSERT INTO matches(game, level, winner_id, loser_id, draw) VALUES(?, ?, ?, ?, ?)",
+                _matches(count, players),
+            )
+
+        start = time.perf_counter()
+        elo.recompute_ratings()
+        print(f"recompute of {count} matches: {time.perf_counter() - start:.2f} s")
+
+        pairs = [random.sample(range(1, players + 1), 2) for _ in range(SINGLE_MATCHES)]
+        start = time.perf_counter()
+        for winner, loser in pairs:
+            elo.record_match("CS2", LEVELS[0], winner, loser)
+        single = (time.perf_counter() - start) / SINGLE_MATCHES
+        print(f"record_match: {single * 1e6:.0f} us per match")
+        connection.close_all()
+
+
+if __name__ == "__main__":
+    main()
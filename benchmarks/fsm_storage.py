@@ -0,0 +1,66 @@
+"""Compare FSM state get/set latency of MemoryStorage and SQLiteStorage.
+
+Each round sets a state and data for one of ``users`` keys and reads both
+back, the way a step of a multi-step form does. SQLiteStorage is measured
+in the default cached mode and in ``shared`` mode (write-through, no cache),
+and the time of the final flush is reported separately.
+
+Usage: python benchmarks/fsm_storage.py [rounds] [users]
+"""
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+
+from app.utils.connection import close_all  # noqa: E402
+from app.utils.fsm_storage import SQLiteStorage  # noqa: E402
+
+
+async def _measure(storage, rounds: int, users: int) -> list[float]:
+    latencies = []
+    for i in range(rounds):
+        key = StorageKey(bot_id=42, chat_id=i % users, user_id=i % users)
+        start = time.perf_counter()
+        await storage.set_state(key, "JoinState:waiting_nickname")
+        await storage.set_data(key, {"tournament_id": i, "nickname": f"user{i}"})
+        await storage.get_state(key)
+        await storage.get_data(key)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:16} median {statistics.median(latencies) * 1e6:8.1f} µs"
+        f"   p95 {p95 * 1e6:8.1f} µs"
+    )
+
+
+async def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print(f"rounds: {rounds}, users: {users}")
+    _report("memory", await _measure(MemoryStorage(), rounds, users))
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteStorage(Path(tmp) / "cached.db")
+        _report("sqlite", await _measure(storage, rounds, users))
+        start = time.perf_counter()
+        await storage.close()
+        print(f"{'':16} final flush {(time.perf_counter() - start) * 1000:.1f} ms")
+        storage = SQLiteStorage(Path(tmp) / "shared.db", shared=True)
+        _report("sqlite (shared)", await _measure(storage, rounds // 10, users))
+        await storage.close()
+        close_all()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
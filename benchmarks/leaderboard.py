@@ -0,0 +1,66 @@
+"""Compare rank lookups in SQLite with the in-memory leaderboard.
+
+A ratings table with ``players`` rows is created in a temporary database.
+The rank of random players is then computed with a COUNT over the score
+index and with ``RankedList.index``, and players are moved with
+``set_score``-like remove/add pairs.
+
+Usage: python benchmarks/leaderboard.py [players]
+"""
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.leaderboard import RankedList  # noqa: E402
+
+LOOKUPS = 2000
+
+
+def main() -> None:
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    scores = {user_id: random.randint(0, 5000) for user_id in range(1, players + 1)}
+    sample = random.sample(range(1, players + 1), LOOKUPS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "ratings.db")
+        conn.execute("CREATE TABLE ratings(user_id INTEGER PRIMARY KEY, score INTEGER DEFAULT 0)")
+        conn.execute("CREATE INDEX idx_ratings_score ON ratings(score DESC, user_id)")
+        conn.executemany("INSERT INTO ratings VALUES(?, ?)", scores.items())
+        conn.commit()
+        start = time.perf_counter()
+        for user_id in sample:
+            score = scores[user_id]
+            conn.execute(
+                "SELECT COUNT(*) FROM ratings WHERE score > ? OR (score = ? AND user_id < ?)",
+                (score, score, user_id),
+            ).fetchone()
+        sql_rank = (time.perf_counter() - start) / LOOKUPS
+        conn.close()
+
+    start = time.perf_counter()
+    board = RankedList(sorted((-score, user_id) for user_id, score in scores.items()))
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for user_id in sample:
+        board.index((-scores[user_id], user_id))
+    memory_rank = (time.perf_counter() - start) / LOOKUPS
+    start = time.perf_counter()
+    for user_id in sample:
+        board.remove((-scores[user_id], user_id))
+        scores[user_id] += random.randint(1, 50)
+        board.add((-scores[user_id], user_id))
+    move = (time.perf_counter() - start) / LOOKUPS
+
+    print(f"{players} players, leaderboard built in {build * 1000:.0f} ms")
+    print(f"rank via SQL COUNT   {sql_rank * 1e6:9.1f} us")
+    print(f"rank via skip list   {memory_rank * 1e6:9.1f} us")
+    print(f"score change         {move * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
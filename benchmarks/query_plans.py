@@ -0,0 +1,164 @@
+"""Check that hot lookups are answered from indexes.
+
+The schema is created in a temporary directory, once per database mode
+(one consolidated file, then the per-domain files with their attachments),
+and filled with sample rows. Every hot path below is then called while the
+SQL it sends is recorded, and each recorded query is run through EXPLAIN
+QUERY PLAN on the connection that sent it. Rows must be found with SEARCH;
+a SCAN is reported unless the hot path reads a whole board, is listed in
+``FULL_SCANS`` and the scan uses a covering index. Sorts in a temporary
+B-tree are reported unless listed in ``ALLOWED``. The exit status is 1 when
+anything is reported, so the script can guard schema changes.
+
+Usage: python benchmarks/query_plans.py [-v]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import (  # noqa: E402
+    achievements,
+    bootstrap,
+    connection,
+    database,
+    elo,
+    feedback_threads,
+    leaderboard,
+    moderation,
+    modlog,
+    submissions,
+)
+
+ROWS = 2000
+
+HOT_PATHS = {
+    "get_user_stats": lambda: database.get_user_stats(7),
+    "get_user_by_username": lambda: database.get_user_by_username("User7"),
+    "get_user_ids_page": lambda: database.get_user_ids_page(0, 100, active_since=0),
+    "get_user_ids_page_staff": lambda: database.get_user_ids_page(0, 100, role="staff"),
+    "get_tournament_ratings": lambda: database.get_tournament_ratings(database.LEADERBOARD_SIZE + 1),
+    "load_leaderboard": leaderboard.load_leaderboard,
+    "get_players_around": lambda: leaderboard.get_players_around(7),
+    "get_participants": lambda: database.get_participants(3),
+    "get_warnings": lambda: moderation.get_warnings(7),
+    "get_strikes": lambda: modlog.get_strikes(7),
+    "get_mod_stats": modlog.get_mod_stats,
+    "get_submission": lambda: submissions.get_submission(ROWS + 1),
+    "expire_submissions": submissions.expire_submissions,
+    "get_queue_stats": submissions.get_queue_stats,
+    "get_thread_user": lambda: feedback_threads.get_thread_user(ROWS + 1),
+    "get_user_achievements": lambda: achievements.get_user_achievements(7),
+    "get_elo_leaderboard": lambda: elo.get_elo_leaderboard("CS2", "Уровень: Про"),
+}
+
+# hot paths reading a whole board in index order, which may SCAN a covering index
+FULL_SCANS = {"load_leaderboard", "get_tournament_ratings", "get_mod_stats"}
+
+# plan details accepted for a hot path, with the reason
+ALLOWED = {
+    # ranking the per-user counts needs a sort of the groups, not of the rows
+    "get_mod_stats": {"USE TEMP B-TREE FOR ORDER BY"},
+    # the rows come from the small role tables, only the role holders are sorted
+    "get_user_ids_page_staff": {"USE TEMP B-TREE FOR ORDER BY"},
+}
+
+
+def _fill() -> None:
+    now = int(time.time())
+    with connection.connect(database.DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO users(user_id, name, username, last_seen) VALUES(?, ?, ?, ?)",
+            ((i, f"User {i}", f"User{i}", now) for i in range(1, ROWS + 1)),
+        )
+    with connection.connect(database.TOURNAMENT_DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO ratings(user_id, score) VALUES(?, ?)",
+            ((i, i * 7 % 500) for i in range(1, ROWS + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO elo_ratings(game, level, user_id, rating, matches) VALUES(?, ?, ?, ?, 1)",
+            (("CS2", "Уровень: Про", i, 1500 + i % 100) for i in range(1, ROWS + 1)),
+        )
+    with connection.connect(database.TOURNAMENT_INFO_DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO participants(tournament_id, user_id, nickname, age) VALUES(?, ?, ?, 20)",
+            ((i % 20, i, f"nick{i}") for i in range(1, ROWS + 1)),
+        )
+    with connection.connect(modlog.LOG_DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO logs(user_id, moderator_id, action, reason, timestamp) VALUES(?, 1, ?, '', ?)",
+            ((i % 300, ("warn", "mute", "ban")[i % 3], now - i * 60) for i in range(ROWS)),
+        )
+    with connection.connect(submissions.SUBMISSIONS_DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO submissions(mod_message_id, user_id, type, status, created) VALUES(?, ?, 'text', ?, ?)",
+            ((i, i, ("pending", "approved", "expired")[i % 3], now - i * 60) for i in range(ROWS)),
+        )
+    leaderboard.load_leaderboard()
+
+
+def _problems(name: str, plan: list[str]) -> list[str]:
+    allowed = ALLOWED.get(name, set())
+    found = []
+    for detail in plan:
+        scan = detail.startswith("SCAN ") and "CONSTANT ROW" not in detail
+        if scan and name in FULL_SCANS and "USING COVERING INDEX" in detail:
+            scan = False
+        if (scan or "TEMP B-TREE" in detail) and detail not in allowed:
+            found.append(detail)
+    return found
+
+
+def _check(mode: str, tmp: Path, verbose: bool) -> int:
+    # every mode gets its own files, also keeping the real ones out of reach
+    for module, path_attr, _ in bootstrap.COMPONENTS.values():
+        setattr(module, path_attr, tmp / Path(getattr(module, path_attr)).name)
+    bootstrap.bootstrap(mode, tmp / "bot.db")
+    _fill()
+    database.invalidate_leaderboard()
+    conns = {}
+    for path in bootstrap.domain_paths():
+        with connection.connect(path) as conn:
+            conns[connection.resolve(path)] = conn
+    failures = 0
+    for name, call in HOT_PATHS.items():
+        statements: list[tuple] = []
+        for conn in conns.values():
+            conn.set_trace_callback(lambda sql, conn=conn: statements.append((conn, sql)))
+        try:
+            call()
+        finally:
+            for conn in conns.values():
+                conn.set_trace_callback(None)
+        queries = [
+            (conn, sql) for conn, sql in statements
+            if sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE", "WITH")
+        ]
+        for conn, sql in queries:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            problems = _problems(name, plan)
+            failures += bool(problems)
+            if problems or verbose:
+                status = "FAIL" if problems else "ok"
+                print(f"{status:4}  {mode} {name}: {' '.join(sql.split())}")
+                for detail in plan:
+                    print(f"        {detail}")
+    connection.close_all()
+    return failures
+
+
+def main() -> None:
+    verbose = "-v" in sys.argv[1:]
+    failures = 0
+    for mode in ("single", "separate"):
+        with tempfile.TemporaryDirectory() as tmp:
+            failures += _check(mode, Path(tmp), verbose)
+    print(f"{len(HOT_PATHS)} hot paths checked in both modes, {failures} queries without a usable index")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
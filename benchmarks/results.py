@@ -0,0 +1,57 @@
+"""Measure applying tournament results from a CSV file.
+
+``players`` players get a rating first; then a CSV file with ``rows``
+results for random players is imported into the consolidated database and
+imported once more, which must change nothing.
+
+Usage: python benchmarks/results.py [rows] [players]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import bootstrap, connection, database, leaderboard, results  # noqa: E402
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        bootstrap.bootstrap("single", Path(tmp) / "bot.db")
+        with connection.connect(database.TOURNAMENT_DB_PATH) as conn:
+            conn.executemany(
+                "INSERT INTO ratings(user_id, score) VALUES(?, ?)",
+                ((i, random.randint(0, 5000)) for i in range(1, players + 1)),
+            )
+        leaderboard.load_leaderboard()
+
+        lines = ["user_id,placement,delta"]
+        for placement, user_id in enumerate(random.sample(range(1, players * 2), rows), 1):
+            lines.append(f"{user_id},{placement}," if placement % 2 else f"{user_id},,{placement % 40}")
+        data = "\n".join(lines).encode()
+
+        start = time.perf_counter()
+        changed = results.import_results_csv(data, tournament_id=1)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        again = results.import_results_csv(data, tournament_id=1)
+        second = time.perf_counter() - start
+
+        with connection.connect(database.TOURNAMENT_DB_PATH) as conn:
+            stored = conn.execute(
+                "SELECT user_id FROM ratings ORDER BY score DESC, user_id LIMIT 1000"
+            ).fetchall()
+        top = [user_id for _, user_id in leaderboard._board.iter_from(0)][:1000]
+        assert [user_id for (user_id,) in stored] == top, "leaderboard out of sync"
+        connection.close_all()
+
+    print(f"import of {rows} results over {players} players: {first * 1000:.1f} ms, {changed} changed")
+    print(f"repeated import: {second * 1000:.1f} ms, result {again}")
+
+
+if __name__ == "__main__":
+    main()
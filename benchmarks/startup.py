@@ -0,0 +1,124 @@
+"""Measure database startup in the separate and single-file layouts.
+
+For each layout the schema is initialized on an empty directory (first
+deploy) and again on the existing files (every later restart), once by
+calling every ``init_*`` function and once with ``bootstrap``. Then
+``users`` legacy per-domain files are generated and imported into a fresh
+consolidated database, which is the one-time cost of switching layouts.
+
+Usage: python benchmarks/startup.py [users]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import (  # noqa: E402
+    achievements,
+    bootstrap,
+    connection,
+    database,
+    feedback_threads,
+    moderation,
+    modlog,
+    submissions,
+)
+
+INITS = (
+    database.init_db,
+    database.init_tournament_db,
+    database.init_tournament_info_db,
+    moderation.init_moderation_db,
+    modlog.init_modlog_db,
+    achievements.init_achievements_db,
+    submissions.init_submissions_db,
+    feedback_threads.init_feedback_db,
+)
+
+
+def _use_dir(directory: Path) -> None:
+    database.DB_PATH = directory / "users.db"
+    database.TOURNAMENT_DB_PATH = directory / "tournaments.db"
+    database.TOURNAMENT_INFO_DB_PATH = directory / "tournaments_info.db"
+    moderation.MOD_DB_PATH = directory / "moderation.db"
+    modlog.LOG_DB_PATH = directory / "moderation_log.db"
+    achievements.DB_PATH = directory / "achievements.db"
+    submissions.SUBMISSIONS_DB_PATH = directory / "submissions.db"
+    feedback_threads.FEEDBACK_DB_PATH = directory / "feedback.db"
+
+
+def _reset() -> None:
+    """Forget open connections and the layout, like a restarted process."""
+    connection.close_all()
+    connection._routes.clear()
+    connection._attachments.clear()
+
+
+def _boot(directory: Path, mode: str) -> float:
+    _reset()
+    _use_dir(directory)
+    start = time.perf_counter()
+    target = bootstrap.configure_databases(mode, directory / "bot.db")
+    for init in INITS:
+        init()
+    if target is not None:
+        bootstrap.import_legacy(target)
+    return time.perf_counter() - start
+
+
+def _bootstrap(directory: Path, mode: str) -> float:
+    _reset()
+    _use_dir(directory)
+    start = time.perf_counter()
+    bootstrap.bootstrap(mode, directory / "bot.db")
+    return time.perf_counter() - start
+
+
+def _make_legacy(directory: Path, users: int) -> None:
+    _reset()
+    _use_dir(directory)
+    bootstrap.configure_databases("separate")
+    for init in INITS:
+        init()
+    _reset()
+    with sqlite3.connect(directory / "users.db") as conn:
+        conn.executemany(
+            "INSERT INTO users(user_id, name, username, xp) VALUES(?, ?, ?, ?)",
+            ((i, f"User {i}", f"user{i}", i % 1000) for i in range(1, users + 1)),
+        )
+    with sqlite3.connect(directory / "tournaments.db") as conn:
+        conn.executemany(
+            "INSERT INTO ratings(user_id, score) VALUES(?, ?)",
+            ((i, i * 7 % 5000) for i in range(1, users + 1)),
+        )
+    with sqlite3.connect(directory / "moderation_log.db") as conn:
+        conn.executemany(
+            "INSERT INTO logs(user_id, moderator_id, action, reason, timestamp) VALUES(?,?,?,?,?)",
+            ((i, 1, "warn", "spam", 0) for i in range(1, users + 1)),
+        )
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    for mode in ("separate", "single"):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = _bootstrap(Path(tmp), mode)
+            # best of several restarts, the first one warms the OS file cache
+            init_restart = min(_boot(Path(tmp), mode) for _ in range(5))
+            restart = min(_bootstrap(Path(tmp), mode) for _ in range(5))
+        print(
+            f"{mode:8}  first start {first * 1000:6.1f} ms"
+            f"   restart: init_* {init_restart * 1000:5.2f} ms, bootstrap {restart * 1000:5.2f} ms"
+        )
+    with tempfile.TemporaryDirectory() as tmp:
+        _make_legacy(Path(tmp), users)
+        imported = _bootstrap(Path(tmp), "single")
+    print(f"import of {users} users, ratings and log rows into bot.db: {imported * 1000:.1f} ms")
+    _reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Compare end-to-end update latency of long polling and webhook mode.
+
+Starts a fake Telegram Bot API server locally, points an echo bot at it and
+measures the time from an update becoming available to the bot's
+sendMessage reaching the fake API, first via getUpdates long polling and
+then via POSTs to the webhook application from ``app.webhook``.
+
+Usage: python benchmarks/update_latency.py [updates]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram import Bot, Dispatcher, Router, types  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+
+from app.config import Config  # noqa: E402
+from app.webhook import build_app  # noqa: E402
+
+TOKEN = "42:benchmark"
+API_PORT = 18081
+WEBHOOK_PORT = 18082
+SECRET = "benchmark-secret"
+
+
+class FakeTelegram:
+    def __init__(self) -> None:
+        self.updates: asyncio.Queue = asyncio.Queue()
+        self.replies: dict[str, asyncio.Future] = {}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        data = dict(await request.post()) if request.can_read_body else {}
+        if method == "getupdates":
+            timeout = float(data.get("timeout", 0))
+            try:
+                update = await asyncio.wait_for(self.updates.get(), timeout)
+                result = [update]
+            except asyncio.TimeoutError:
+                result = []
+            return web.json_response({"ok": True, "result": result})
+        if method == "sendmessage":
+            future = self.replies.pop(data["text"], None)
+            if future and not future.done():
+                future.set_result(time.perf_counter())
+            return web.json_response({"ok": True, "result": _message(0, data["text"])})
+        if method == "getme":
+            return web.json_response(
+                {"ok": True, "result": {"id": 42, "is_bot": True, "first_name": "bench"}}
+            )
+        return web.json_response({"ok": True, "result": True})
+
+
+def _message(message_id: int, text: str) -> dict:
+    return {
+        "message_id": message_id,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "user"},
+        "text": text,
+    }
+
+
+def _update(update_id: int) -> dict:
+    return {"update_id": update_id, "message": _message(update_id, f"ping {update_id}")}
+
+
+def _build_dispatcher() -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def echo(message: types.Message) -> None:
+        await message.answer(message.text)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def _measure(fake: FakeTelegram, updates: range, deliver) -> list[float]:
+    latencies = []
+    for update_id in updates:
+        future = asyncio.get_running_loop().create_future()
+        fake.replies[f"ping {update_id}"] = future
+        start = time.perf_counter()
+        await deliver(_update(update_id))
+        latencies.append(await asyncio.wait_for(future, 5) - start)
+    return latencies
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:8} median {statistics.median(latencies) * 1000:6.2f} ms"
+        f"   p95 {p95 * 1000:6.2f} ms"
+    )
+
+
+async def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    fake = FakeTelegram()
+    api = web.Application()
+    api.router.add_route("*", "/bot{token}/{method}", fake.handle)
+    api_runner = web.AppRunner(api)
+    await api_runner.setup()
+    await web.TCPSite(api_runner, "127.0.0.1", API_PORT).start()
+    server = TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")
+
+    # long polling
+    bot = Bot(TOKEN, session=AiohttpSession(api=server))
+    dp = _build_dispatcher()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+    polling_latencies = await _measure(fake, range(1, count + 1), fake.updates.put)
+    await dp.stop_polling()
+    await polling
+
+    # webhook
+    bot = Bot(TOKEN, session=AiohttpSession(api=server))
+    dp = _build_dispatcher()
+    config = Config(
+        bot_token=TOKEN,
+        admin_id=0,
+        mod_chat_id=0,
+        feedback_chat_id=0,
+        forum_chat_id=0,
+        webhook_secret=SECRET,
+    )
+    hook_runner = web.AppRunner(build_app(dp, bot, config))
+    await hook_runner.setup()
+    await web.TCPSite(hook_runner, "127.0.0.1", WEBHOOK_PORT).start()
+    url = f"http://127.0.0.1:{WEBHOOK_PORT}{config.webhook_path}"
+    async with ClientSession() as client:
+
+        async def post(update: dict) -> None:
+            async with client.post(
+                url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+            ) as resp:
+                resp.raise_for_status()
+
+        webhook_latencies = await _measure(fake, range(count + 1, 2 * count + 1), post)
+    await hook_runner.cleanup()
+    await bot.session.close()
+    await api_runner.cleanup()
+
+    print(f"updates: {count}")
+    _report("polling", polling_latencies)
+    _report("webhook", webhook_latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,36 +1,76 @@
 import asyncio
 import logging
+import time
 
 from aiogram import Bot, Dispatcher
 
 from app.config import load_config, Config
 from app.handlers import register_handlers
+from app.webhook import run_webhook
+from app.utils.bootstrap import bootstrap
+from app.utils.writebehind import get_flush_stats, start_flusher, stop_flusher
+from app.utils.submissions import start_expirer, stop_expirer
+from app.utils.history import start_sweeper, stop_sweeper
+from app.utils.broadcast import resume_broadcasts, stop_broadcasts
+from app.utils.moderation import start_role_refresher, stop_role_refresher
+from app.utils.limiter import create_backend
+from app.utils.spam import FLOOD_MESSAGE_COUNT, set_limiter_backend
+from app.utils.scheduler import UpdateScheduler
+from app.utils.outbound import setup_outbound
+from app.utils.fsm_storage import FSM_DB_PATH, SQLiteStorage
 from app.utils import (
-    init_db,
-    init_tournament_db,
-    init_tournament_info_db,
-    init_moderation_db,
-    init_achievements_db,
-    init_modlog_db,
+    init_history_db,
+    get_history_stats,
+    close_all,
 )
 
 logging.basicConfig(level=logging.INFO)
 
 
 async def main() -> None:
+    started = time.perf_counter()
     config: Config = load_config()
-    init_db()
-    init_tournament_db()
-    init_tournament_info_db()
-    init_moderation_db()
-    init_modlog_db()
-    init_achievements_db()
+    report = bootstrap(config.db_mode, config.db_path or None)
+    if config.history_persist:
+        init_history_db()
+    set_limiter_backend(
+        create_backend(
+            config.limiter_backend,
+            FLOOD_MESSAGE_COUNT,
+            config.limiter_db_path or None,
+        )
+    )
     bot = Bot(config.bot_token)
-    dp = Dispatcher()
+    outbound = setup_outbound(bot, moderation_chats={config.mod_chat_id})
+    scheduler = UpdateScheduler(config.max_concurrent_updates)
+    storage = SQLiteStorage(config.fsm_db_path or FSM_DB_PATH, shared=config.fsm_shared)
+    dp = Dispatcher(storage=storage, events_isolation=scheduler)
 
     register_handlers(dp, config)
 
-    await dp.start_polling(bot)
+    start_flusher()
+    start_expirer()
+    start_sweeper()
+    start_role_refresher()
+    await resume_broadcasts(bot)
+    report["startup_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    logging.info("Startup report: %s", report)
+    try:
+        if config.webhook_url:
+            await run_webhook(dp, bot, config)
+        else:
+            await dp.start_polling(bot)
+    finally:
+        await stop_broadcasts()
+        await stop_flusher()
+        await stop_expirer()
+        await stop_sweeper()
+        await stop_role_refresher()
+        logging.info("Update scheduler stats: %s", scheduler.stats())
+        logging.info("Message history stats: %s", get_history_stats())
+        logging.info("Write-behind stats: %s", get_flush_stats())
+        logging.info("Outbound API stats: %s", outbound.stats())
+        close_all()
 
 
 if __name__ == "__main__":